@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+compile time for long files full of nested `fn`s.
+
+every nested fn gets hoisted to the front of the file during preprocessing, so each one is a
+prepend into a top-level node list that only grows. doubling --fns should roughly double the
+time, anything worse means some child list operation went linear again.
+
+    python3 compiler/benchmarks/bench_hoisting.py --fns 1000 2000 4000 8000
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from utils.logger import configure_logger_from_args
+configure_logger_from_args(None)
+
+from compile_api import CompileOptions, compile_sources
+
+
+def generate(fns: int) -> str:
+    out = []
+    for i in range(fns):
+        # a top level fn whose `do` gets linked to it, and one nested in a block that gets hoisted
+        out += [f"fn f_{i}", "do", "\treturn", f"\t\tint {i}"]
+        out += ["do", f"\tfn g_{i}", "\t\tdo", "\t\t\treturn", f"\t\t\t\tint {i}"]
+    return "\n".join(out) + "\n"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fns", type=int, nargs="+", default=[1000, 2000, 4000])
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    options = CompileOptions(parse_cache=False, jobs=1)
+    for fns in args.fns:
+        files = {"main.67lang": generate(fns)}
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            result = compile_sources(files, options)
+            timings.append(time.perf_counter() - start)
+            assert result.ok, result.errors or result.crash
+        print(f"{fns:>6} fns: median {statistics.median(timings) * 1000:9.1f} ms, "
+              f"{statistics.median(timings) / fns * 1e6:7.1f} us/fn")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+parse tree memory benchmark: bytes per node for large generated programs.
+
+parses a generated source (same generator as bench_parser.py) and reports tracemalloc's count
+of bytes held by the tree plus the process peak RSS. run each size in its own process for a
+clean RSS number.
+
+    python3 compiler/benchmarks/bench_memory.py --lines 100000 --depth 8
+"""
+
+import argparse
+import resource
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from utils.logger import configure_logger_from_args
+configure_logger_from_args(None)
+
+from bench_parser import generate
+from core.tree_parser import TreeParser
+
+
+def count_nodes(root) -> int:
+    count = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children)
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=100_000)
+    parser.add_argument("--depth", type=int, default=8)
+    args = parser.parse_args()
+
+    source = generate(args.lines, args.depth)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    root = TreeParser().parse_tree(source)
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    nodes = count_nodes(root)
+    # ru_maxrss is KiB on linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    print(f"{args.lines} lines, depth {args.depth}: {nodes} nodes, {held / nodes:.0f} bytes/node, "
+          f"tree {held / 2**20:.1f} MiB, peak rss {peak_rss / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+TreeParser throughput benchmark over generated sources.
+
+each source is a sawtooth: blocks that nest `depth` levels deep and then unwind, repeated until
+the file has the requested number of lines. depth 1 is a flat file, big depths are what used to
+hurt (quadratic indent stripping, recursive tree copy).
+
+    python3 compiler/benchmarks/bench_parser.py --lines 10000 100000 1000000 --depths 1 8 64 1024
+
+with --files, every size/depth gets split over that many files and parsed through
+`compile_api.parse_sources` once per --jobs value instead.
+
+    python3 compiler/benchmarks/bench_parser.py --lines 1000000 --depths 8 --files 200 --jobs 1 2 4 8
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from utils.logger import configure_logger_from_args
+configure_logger_from_args(None)
+
+from compile_api import parse_sources
+from core.tree_parser import TreeParser
+
+
+def generate(lines: int, depth: int) -> str:
+    out = []
+    level = 0
+    going_down = True
+    for i in range(lines):
+        if i % 7 == 6:
+            # some blank lines, like real code has
+            out.append("")
+            continue
+        out.append("\t" * level + ("do print" if going_down else f'string "line {i}"'))
+        if going_down:
+            level += 1
+            going_down = level < depth
+        else:
+            level -= 1
+            going_down = level <= 0
+            level = max(level, 0)
+    return "\n".join(out)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--depths", type=int, nargs="+", default=[1, 8, 64, 1024])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--files", type=int, help="split the lines over this many files")
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1], help="with --files, parser process counts to try")
+    args = parser.parse_args()
+
+    for lines in args.lines:
+        for depth in args.depths:
+            if args.files:
+                files = {f"{i}.67lang": generate(lines // args.files, depth) for i in range(args.files)}
+                for jobs in args.jobs:
+                    report(f"{lines:>9} lines, depth {depth:>5}, {args.files} files, {jobs:>2} jobs",
+                           lines, args.runs, lambda: parse_sources(files, jobs))
+            else:
+                source = generate(lines, depth)
+                report(f"{lines:>9} lines, depth {depth:>5}", lines, args.runs, lambda: TreeParser().parse_tree(source))
+
+
+def report(label: str, lines: int, runs: int, parse) -> None:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        parse()
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    print(f"{label}: median {statistics.median(timings) * 1000:9.1f} ms, {lines / best / 1000:8.0f}k lines/s")
+
+
+if __name__ == "__main__":
+    main()
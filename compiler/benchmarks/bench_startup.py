@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+compiler startup benchmark.
+
+times a full `main.py` run on a hello world program, against the bare interpreter floor
+and against the old eager path (typescript_builtins imported up front, as builtin_calls.py used to).
+each variant is a fresh process so we measure cold-ish startup, not warm caches inside one interpreter.
+
+    python3 compiler/benchmarks/bench_startup.py --runs 10
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).parent.parent / "src"
+MAIN = SRC_DIR / "main.py"
+
+HELLO = 'do print\n\tstring "hello world"\n'
+
+EAGER = f"""
+import sys, runpy
+sys.path.insert(0, {str(SRC_DIR)!r})
+import compiler_types.typescript_builtins
+sys.argv = [{str(MAIN)!r}, *sys.argv[1:]]
+runpy.run_path({str(MAIN)!r}, run_name="__main__")
+"""
+
+
+def time_runs(cmd: list[str], runs: int) -> list[float]:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        timings.append(time.perf_counter() - start)
+        assert proc.returncode == 0, f"{cmd} failed:\n{proc.stdout}\n{proc.stderr}"
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp)
+        (tmp_path / "hello.67lang").write_text(HELLO)
+        out = str(tmp_path / "out.js")
+
+        # one untimed run so the catalog exists before we measure anything
+        time_runs([sys.executable, str(MAIN), tmp, out], 1)
+
+        variants = {
+            "interpreter floor": [sys.executable, "-c", "pass"],
+            "eager builtins": [sys.executable, "-c", EAGER, tmp, out],
+            "lazy catalog": [sys.executable, str(MAIN), tmp, out],
+        }
+        for label, cmd in variants.items():
+            timings = time_runs(cmd, args.runs)
+            print(f"{label:>20}: median {statistics.median(timings) * 1000:8.1f} ms, "
+                  f"min {min(timings) * 1000:8.1f} ms over {args.runs} runs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+per pipeline step throughput, in nodes per second, over a generated program of commented
+functions with locals, branches and calls.
+
+    python3 compiler/benchmarks/bench_steps.py --fns 200
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from utils.logger import configure_logger_from_args
+configure_logger_from_args(None)
+
+from compiler_types.proper_types import type_registry
+from compile_api import shared_registries
+from core.macrocosm import create_macrocosm
+from core.tree_parser import TreeParser
+
+
+def generate(fns: int) -> str:
+    out = []
+    for i in range(fns):
+        out += [
+            f"note helper number {i}",
+            "\tit takes a number and does some arithmetic on it.",
+            "\tnothing exciting, just enough text to look like a real comment.",
+            f"fn f_{i}",
+            "\tparam x",
+            "\t\ttype int",
+            "do",
+            "\tlocal y",
+            "\t\ttype int",
+            "\t\tdo add",
+            "\t\t\tget x",
+            f"\t\t\tint {i}",
+            "\tif",
+            "\t\tdo nondesc",
+            "\t\t\tint 10",
+            "\t\t\tget y",
+            "\tthen",
+            "\t\tdo print",
+            "\t\t\tget y",
+            "\treturn",
+            "\t\tget y",
+            "do print",
+            f"\tdo f_{i}",
+            f"\t\tint {i}",
+        ]
+    return "\n".join(out) + "\n"
+
+
+def count_nodes(root) -> int:
+    count = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.child_view)
+    return count
+
+
+def run(source: str) -> dict[str, tuple[float, int]]:
+    """compiles once, returns step name -> (seconds, nodes in the tree when the step started)"""
+    type_registry.reset()
+    macrocosm = create_macrocosm(shared_registries())
+    macrocosm.register(TreeParser().parse_tree(source))
+    results = {}
+    for step in macrocosm.processing_steps:
+        process_node = step.process_node
+
+        # only the outermost call, the one compile() makes on the root, gets timed
+        def timed(ctx, process_node=process_node, name=type(step).__name__):
+            if ctx.node is not macrocosm.root_node:
+                return process_node(ctx)
+            nodes = count_nodes(ctx.node)
+            start = time.perf_counter()
+            rv = process_node(ctx)
+            results[name] = (time.perf_counter() - start, nodes)
+            return rv
+
+        step.process_node = timed
+    macrocosm.compile()
+    assert not macrocosm.compile_errors, macrocosm.compile_errors[:3]
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fns", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    source = generate(args.fns)
+    best: dict[str, tuple[float, int]] = {}
+    for _ in range(args.runs):
+        for name, (seconds, nodes) in run(source).items():
+            if name not in best or seconds < best[name][0]:
+                best[name] = (seconds, nodes)
+    for name, (seconds, nodes) in best.items():
+        print(f"{name:34} {nodes:7} nodes {seconds * 1000:9.1f} ms {nodes / seconds / 1000:9.0f}k nodes/s")
+
+
+if __name__ == "__main__":
+    main()
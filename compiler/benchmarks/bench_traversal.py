@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+tree walk throughput of the steps that walk down to their nodes (linking, preprocessing,
+typechecking), over synthetic trees that are all walking and hardly any work.
+
+deep is a single chain of `--nodes` macro-less nodes, wide is a root with that many of them as
+children. every chain node also gets an `int` and a comment leaf, so none of the steps can prune
+it away. a walk that recurses once per level gives up on deep trees at the recursion limit.
+
+    python3 compiler/benchmarks/bench_traversal.py --nodes 500 5000 50000
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from io import StringIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from utils.logger import configure_logger_from_args
+configure_logger_from_args(None)
+
+from compiler_types.proper_types import type_registry
+from compile_api import shared_registries
+from core.macro_registry import MacroContext
+from core.macrocosm import create_macrocosm
+from core.node import Node, Position
+from linking.code_block_linking import CodeBlockLinkingStep
+from pipeline.steps import PreprocessingStep, TypeCheckingStep
+
+STEPS = (CodeBlockLinkingStep, PreprocessingStep, TypeCheckingStep)
+
+
+def leaves(line: int) -> list[Node]:
+    return [Node("int 1", Position(line), []), Node("note leaf", Position(line), [])]
+
+
+def deep(nodes: int) -> Node:
+    node = Node("x", Position(nodes), leaves(nodes))
+    for line in range(nodes - 1, 0, -1):
+        node = Node("x", Position(line), [node] + leaves(line))
+    return Node("67lang:solution", Position(0), [node])
+
+
+def wide(nodes: int) -> Node:
+    return Node("67lang:solution", Position(0), [Node("x", Position(line), leaves(line)) for line in range(nodes)])
+
+
+def run(root: Node) -> dict[str, float]:
+    """walks the tree with each step in pipeline order, returns step name -> seconds"""
+    type_registry.reset()
+    macrocosm = create_macrocosm(shared_registries())
+    macrocosm.root_node = root
+    results = {}
+    for step in macrocosm.processing_steps:
+        if not isinstance(step, STEPS):
+            continue
+        ctx = MacroContext(statement_out=StringIO(), expression_out=StringIO(), node=root,
+                           compiler=macrocosm, current_step=step)
+        start = time.perf_counter()
+        step.process_node(ctx)
+        results[type(step).__name__] = time.perf_counter() - start
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, nargs="+", default=[500, 5000, 50000])
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    for shape in (deep, wide):
+        for nodes in args.nodes:
+            timings: dict[str, list[float]] = {}
+            try:
+                for _ in range(args.runs):
+                    for name, seconds in run(shape(nodes)).items():
+                        timings.setdefault(name, []).append(seconds)
+            except RecursionError:
+                print(f"{shape.__name__:>4} {nodes:>6}: hit the recursion limit")
+                continue
+            for name, seconds in timings.items():
+                median = statistics.median(seconds)
+                print(f"{shape.__name__:>4} {nodes:>6}: {name:22} {median * 1000:8.1f} ms "
+                      f"{3 * nodes / median / 1000:7.0f}k nodes/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+in-process compiler entry point. `main.py` is a thin command line wrapper around this,
+and anything that wants to compile without spawning a process (the compile server, tests,
+the language server, batch runs) should come through here too.
+
+    result = compile_sources({"main.67lang": source})
+    if result.ok:
+        print(result.js)
+
+logging is process global and stays the caller's business - configure it before the first compile.
+"""
+
+import os
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import cache
+from pathlib import Path
+from typing import Any, Mapping
+
+from compiler_types.proper_types import type_registry
+from core.macro_registry import MacroRegistry
+from core.macrocosm import create_macrocosm, create_registries
+from core.node import Node
+from core.parse_cache import ParseCache, PARSE_CACHE_DIR
+from core.tree_parser import FlatTree, TreeParser, parse_flat
+from utils.logger import default_logger
+from utils.profiler import CompileProfiler, stage
+
+
+@dataclass(frozen=True)
+class CompileOptions:
+    # produce the `.67lang.expanded` form instead of js
+    expand: bool = False
+    # the inputs are `.67lang.expanded` rather than `.67lang`
+    rte: bool = False
+    # parser processes. None means one per cpu, small inputs get parsed serially regardless
+    jobs: int | None = None
+    # reuse parse trees of unchanged files across compilations, see core/parse_cache.py
+    parse_cache: bool = True
+    # where it lives, None for the default under compiler/.cache
+    parse_cache_dir: Path | None = None
+
+    @property
+    def file_pattern(self) -> str:
+        return "*.67lang.expanded" if self.rte else "*.67lang"
+
+
+@dataclass
+class CompileResult:
+    # emitted js. None on compile errors, a crash, or in expand mode
+    js: str | None = None
+    # the expanded form, only in expand mode. written even if compilation failed, which helps debugging
+    expanded: str | None = None
+    # same entries `main.py --errors-file` writes out
+    errors: list[dict[str, Any]] = field(default_factory=list)
+    # formatted traceback if the compiler itself blew up
+    crash: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors and self.crash is None
+
+
+@cache
+def shared_registries() -> dict[str, MacroRegistry]:
+    """built once per process and reused by every compilation"""
+    return create_registries()
+
+
+def collect_sources(input_dir: Path, options: CompileOptions = CompileOptions()) -> dict[Path, str]:
+    """every source file under `input_dir` that the given options would compile"""
+    # sorted, so the program (and every generated identifier) doesn't depend on directory listing order
+    paths = sorted(input_dir.rglob(options.file_pattern))
+    default_logger.compile(lambda: f"found {len(paths)} .67lang files: {[str(f) for f in paths]}")
+    return {path: path.read_text() for path in paths}
+
+
+# below either of these, a process pool costs more to start than it saves
+PARALLEL_MIN_FILES = 2
+PARALLEL_MIN_BYTES = 1024 * 1024
+
+
+def parse_sources(
+    files: Mapping[Path | str, str],
+    jobs: int | None = None,
+    parse_cache: ParseCache | None = None,
+) -> list[Node]:
+    """parses every file, from the cache or in parallel when it's worth it. trees come back in `files` order"""
+    names = list(files.keys())
+    sources = list(files.values())
+    flats: list[FlatTree | None] = [None] * len(sources)
+    if parse_cache is not None:
+        for i, source in enumerate(sources):
+            flats[i] = parse_cache.get(source)
+            if flats[i] is not None:
+                default_logger.compile("parse cache hit for {}", names[i])
+
+    missing = [i for i, flat in enumerate(flats) if flat is None]
+    parsed = _parse_flat_all([names[i] for i in missing], [sources[i] for i in missing], jobs)
+    for i, flat in zip(missing, parsed):
+        flats[i] = flat
+        if parse_cache is not None:
+            parse_cache.put(sources[i], flat)
+    if parse_cache is not None:
+        parse_cache.evict()
+
+    parser = TreeParser()
+    return [parser.build_tree(flat) for flat in flats]
+
+
+def _parse_flat_all(names: list[Path | str], sources: list[str], jobs: int | None) -> list[FlatTree]:
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(sources))
+    total_bytes = sum(len(source) for source in sources)
+    if jobs <= 1 or len(sources) < PARALLEL_MIN_FILES or total_bytes < PARALLEL_MIN_BYTES:
+        parser = TreeParser()
+        flats = []
+        for name, source in zip(names, sources):
+            default_logger.compile("parsing {}", name)
+            with default_logger.parse.indent("parsing {}", name):
+                flats.append(parser.parse_flat(source))
+        return flats
+
+    # no per-file spans from here, the workers' loggers have no tracer
+    default_logger.compile("parsing {} files with {} processes", len(sources), jobs)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        # the flat form pickles far cheaper than a Node tree would
+        return list(pool.map(parse_flat, sources, chunksize=max(1, len(sources) // (jobs * 4))))
+
+
+def compile_sources(
+    files: Mapping[Path | str, str],
+    options: CompileOptions = CompileOptions(),
+    registries: dict[str, MacroRegistry] | None = None,
+    profiler: CompileProfiler | None = None,
+) -> CompileResult:
+    """compiles the given sources (path -> contents) as one program, timing it into `profiler` if given"""
+    if profiler is not None:
+        profiler.begin_compilation()
+    # user `type` definitions go into the global registry, don't let them leak between compilations
+    type_registry.reset()
+    with stage(profiler, "macrocosm setup"):
+        macrocosm = create_macrocosm(registries if registries is not None else shared_registries(), profiler)
+
+    with default_logger.indent("compile", "parsing files"), stage(profiler, "parse"):
+        parse_cache = None
+        if options.parse_cache:
+            parse_cache = ParseCache(options.parse_cache_dir or PARSE_CACHE_DIR)
+        for name, node in zip(files, parse_sources(files, options.jobs, parse_cache)):
+            if profiler is not None:
+                profiler.add_file(str(name), node)
+            macrocosm.register(node)
+
+    result = CompileResult()
+    compiled = None
+    with default_logger.indent("compile", "single-step compilation"), stage(profiler, "compile"):
+        try:
+            compiled = macrocosm.compile()
+        except Exception as e:
+            result.crash = "".join(traceback.format_exception(*sys.exc_info()))
+            default_logger.compile("compilation crashed: {}", e)
+
+    if options.expand:
+        # TODO what happens if we had compile errors?
+        #  might need to think about this. might need to make this opt-in, it's useful
+        #  to write out the expansion for debugging but it is very much an invalid expansion.
+        #  oh! i know. wrap it in a `67lang.invalid_solution` which causes a compile error!
+        result.expanded = "".join(f"{node!r}\n\n" for node in macrocosm.nodes)
+    elif compiled:
+        result.js = compiled
+    result.errors = macrocosm.compile_errors
+    return result
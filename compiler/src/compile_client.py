@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+thin client for `compile_server.py`. takes exactly the same arguments as `main.py`
+and behaves the same way - same output, same files written, same exit code.
+
+    compile_client.py [--socket PATH] input_dir output_file [main.py flags...]
+
+deliberately imports nothing from the compiler, the whole point is to start fast.
+"""
+
+import json
+import os
+import socket
+import struct
+import sys
+
+# keep in sync with compile_server.py, importing it would defeat the point
+_LENGTH = struct.Struct(">I")
+DEFAULT_SOCKET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".cache", "compile_server.sock")
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        assert chunk, "compile server hung up mid response"
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def main() -> None:
+    argv = sys.argv[1:]
+    socket_path = DEFAULT_SOCKET
+    if argv[:1] == ["--socket"]:
+        socket_path, argv = argv[1], argv[2:]
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        sys.exit(f"no compile server listening on {socket_path}. start one with compile_server.py")
+
+    with sock:
+        data = json.dumps({"argv": argv, "cwd": os.getcwd()}).encode()
+        sock.sendall(_LENGTH.pack(len(data)) + data)
+        (length,) = _LENGTH.unpack(_recv_exactly(sock, _LENGTH.size))
+        response = json.loads(_recv_exactly(sock, length))
+
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+    sys.exit(response["exit_code"])
+
+
+if __name__ == "__main__":
+    main()
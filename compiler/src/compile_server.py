@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+long lived compile server. keeps the compiler imported and warm so a compile costs
+milliseconds instead of a fresh interpreter + all the imports.
+
+    compile_server.py [--socket PATH]
+
+talk to it with `compile_client.py`, which takes exactly the same arguments as `main.py`.
+requests are handled one at a time: the compiler has process global state (the type registry,
+the logger), so there is no point pretending otherwise.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import traceback
+from pathlib import Path
+
+from utils.cache import CACHE_DIR, fingerprint
+
+DEFAULT_SOCKET = CACHE_DIR / "compile_server.sock"
+
+# every message either way is a 4 byte big endian length followed by that much utf-8 json
+_LENGTH = struct.Struct(">I")
+
+
+def send_message(sock: socket.socket, message: dict) -> None:
+    data = json.dumps(message).encode()
+    sock.sendall(_LENGTH.pack(len(data)) + data)
+
+
+def recv_message(sock: socket.socket) -> dict | None:
+    header = _recv_exactly(sock, _LENGTH.size)
+    if header is None:
+        return None
+    (length,) = _LENGTH.unpack(header)
+    data = _recv_exactly(sock, length)
+    assert data is not None, "connection closed mid message"
+    return json.loads(data)
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes | None:
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def source_fingerprint() -> bytes:
+    """hash of every compiler source file, so an edit to the compiler is noticed"""
+    src_dir = Path(__file__).parent
+    return fingerprint(sorted(p for p in src_dir.rglob("*.py") if not p.name.startswith("test_")))
+
+
+class CompileServer(socketserver.UnixStreamServer):
+    def __init__(self, socket_path: Path):
+        self._warm_up()
+        self.fingerprint = source_fingerprint()
+        super().__init__(str(socket_path), CompileHandler)
+
+    def _warm_up(self) -> None:
+        # everything main.py would import, the shared registries, the type lattice and the builtin
+        # catalog index, so the first request isn't slow
+        from utils.logger import configure_logger_from_args
+        configure_logger_from_args(None)
+        from compile_api import shared_registries
+        shared_registries()
+        from compiler_types.proper_types import type_lattice
+        type_lattice()
+        # the index is otherwise opened by the first lookup, which would be the first request's
+        from pipeline.builtin_calls import builtin_catalog
+        builtin_catalog.load()
+
+    def compile(self, argv: list[str], cwd: str) -> dict:
+        if source_fingerprint() != self.fingerprint:
+            return {
+                "exit_code": 1,
+                "stdout": "",
+                "stderr": "compiler sources changed since the compile server started. restart it.\n",
+            }
+
+        import main as compiler_main
+        from utils.logger import default_logger
+
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        saved_cwd, saved_log_output = os.getcwd(), default_logger.output
+        default_logger.output = stderr
+        try:
+            os.chdir(cwd)
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                try:
+                    exit_code = compiler_main.main(argv)
+                except SystemExit as e:
+                    # argparse bailing out
+                    exit_code = _exit_code(e)
+                except Exception:
+                    # what the interpreter would have printed before dying
+                    traceback.print_exc()
+                    exit_code = 1
+        finally:
+            default_logger.output = saved_log_output
+            os.chdir(saved_cwd)
+        return {"exit_code": exit_code, "stdout": stdout.getvalue(), "stderr": stderr.getvalue()}
+
+
+class CompileHandler(socketserver.BaseRequestHandler):
+    server: CompileServer
+
+    def handle(self) -> None:
+        request = recv_message(self.request)
+        if request is None:
+            return
+        send_message(self.request, self.server.compile(request["argv"], request["cwd"]))
+
+
+def _exit_code(e: SystemExit) -> int:
+    if e.code is None:
+        return 0
+    if isinstance(e.code, int):
+        return e.code
+    # `exit("message")` prints the message and exits with 1
+    print(e.code, file=sys.stderr)
+    return 1
+
+
+def _claim_socket(socket_path: Path) -> None:
+    if not socket_path.exists():
+        socket_path.parent.mkdir(parents=True, exist_ok=True)
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(str(socket_path))
+    except (ConnectionRefusedError, FileNotFoundError):
+        # left over from a server that died
+        socket_path.unlink(missing_ok=True)
+        return
+    finally:
+        probe.close()
+    sys.exit(f"a compile server is already listening on {socket_path}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="compile_server.py")
+    parser.add_argument('--socket', type=Path, default=DEFAULT_SOCKET, help="unix socket to listen on")
+    args = parser.parse_args()
+
+    _claim_socket(args.socket)
+    server = CompileServer(args.socket)
+    # a plain `kill` should clean up the socket just like ctrl+c does
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"compile server listening on {args.socket}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        args.socket.unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    main()
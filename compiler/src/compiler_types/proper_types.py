@@ -6,13 +6,65 @@ Generic types are first-class citizens.
 """
 
 from dataclasses import dataclass
-from typing import List, Dict, Optional, Set, Union
-from abc import ABC, abstractmethod
+from typing import Any, Iterable, List, Dict, Optional, Set, Union
+from abc import ABC, ABCMeta, abstractmethod
+from weakref import WeakValueDictionary
 
 
-class Type(ABC):
+class _Interned(ABCMeta):
+    """
+    hash consing for the types: constructing one hands back the existing equal instance if there
+    is one, so equal types are the same object. they compare by identity (list<dict<str, str>> used
+    to be walked all the way down on every == and every hash), and whatever follows from the
+    structure is worked out once per distinct type, in _interned.
+
+    weak, so the types of user code go away with it in a long lived process. pickling goes through
+    the constructor (Type.__reduce__), so unpickled types are interned like any other
+    """
+
+    # nothing registers virtual subclasses of these, and ABCMeta's checks are a python call on
+    # every isinstance(x, Type) - unification does little else
+    __instancecheck__ = type.__instancecheck__
+    __subclasscheck__ = type.__subclasscheck__
+
+    def __call__(cls, *args, **kwargs):
+        instance = super().__call__(*args, **kwargs)
+        values = instance._values()
+        key = (cls, values)
+        existing = _interner.get(key)
+        if existing is not None:
+            return existing
+        # what the dataclass __hash__ used to come up with, so sets of types iterate as they did
+        object.__setattr__(instance, "_hash", hash(values))
+        instance._interned()
+        _interner[key] = instance
+        return instance
+
+
+# (class, field values) -> the one instance with those
+_interner: "WeakValueDictionary[tuple, Type]" = WeakValueDictionary()
+
+
+class Type(ABC, metaclass=_Interned):
     """Base class for all types in the 67lang type system."""
-    
+
+    # the names of the type variables in it, in order. set in _interned
+    _free: tuple[str, ...] = ()
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __reduce__(self):
+        return type(self), self._values()
+
+    @abstractmethod
+    def _values(self) -> tuple:
+        """the fields, in order - what makes two types the same type"""
+        pass
+
+    def _interned(self) -> None:
+        """precomputes what's derived from the structure, once per distinct type"""
+
     @abstractmethod
     def __str__(self) -> str:
         pass
@@ -28,7 +80,7 @@ class Type(ABC):
         pass
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class PrimitiveType(Type):
     """Primitive types like int, string, bool."""
     name: str
@@ -36,46 +88,26 @@ class PrimitiveType(Type):
     def __str__(self) -> str:
         return self.name
     
+    def _values(self) -> tuple:
+        return (self.name,)
+    
     def is_assignable_to(self, other: Type) -> bool:
         if isinstance(other, PrimitiveType):
             if self.name == other.name:
                 return True
-            # Check type hierarchy for subtype relationships
-            from .type_hierarchy import type_hierarchy
-            if self in type_hierarchy:
-                return other in type_hierarchy[self] or other.name in type_hierarchy[self] or any(
-                    self._is_transitive_subtype(parent, other.name, type_hierarchy) 
-                    for parent in type_hierarchy[self]
-                )
+            # the hierarchy has supertypes both as Type objects and by name
+            lattice = type_lattice()
+            return lattice.extends(self, other) or lattice.extends(self, other.name)
         elif isinstance(other, str):
             # Handle string type compatibility
-            if self.name == other:
-                return True
-            # Check type hierarchy for assignability
-            from .type_hierarchy import type_hierarchy
-            if self in type_hierarchy:
-                return other in type_hierarchy[self] or any(
-                    self._is_transitive_subtype(parent, other, type_hierarchy) 
-                    for parent in type_hierarchy[self]
-                )
-        return False
-    
-    def _is_transitive_subtype(self, current: str, target: str, hierarchy: dict) -> bool:
-        """Check if current is transitively a subtype of target."""
-        if current == target:
-            return True
-        if current in hierarchy:
-            return any(
-                self._is_transitive_subtype(parent, target, hierarchy)
-                for parent in hierarchy[current]
-            )
+            return self.name == other or type_lattice().extends(self, other)
         return False
     
     def is_concrete(self) -> bool:
         return True
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class TypeVariable(Type):
     """Type variable like T, K, V that can be substituted."""
     name: str
@@ -87,6 +119,13 @@ class TypeVariable(Type):
             return f"{self.name} extends {constraint_str}"
         return self.name
     
+    def _values(self) -> tuple:
+        return (self.name, self.constraints)
+    
+    def _interned(self) -> None:
+        object.__setattr__(self, "_free", (self.name,))
+        super()._interned()
+    
     def is_assignable_to(self, other: Type) -> bool:
         # Type variables are assignable based on their constraints
         if isinstance(other, TypeVariable):
@@ -99,13 +138,24 @@ class TypeVariable(Type):
         return False
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class ComplexType(Type):
     """Complex types like List<String>, Dict<String, Module>, or user-defined types."""
     name: str
     type_params: tuple[Type, ...] = ()
     fields: tuple[tuple[str, Type], ...] = ()  # Using tuple for immutability
     
+    def _values(self) -> tuple:
+        return (self.name, self.type_params, self.fields)
+    
+    def _interned(self) -> None:
+        object.__setattr__(self, "_free", _free_variables(self.type_params))
+        field_types: dict[str, Type] = {}
+        for name, field_type in self.fields:
+            field_types.setdefault(name, field_type)
+        object.__setattr__(self, "_field_types", field_types)
+        super()._interned()
+    
     def __str__(self) -> str:
         if not self.type_params:
             return self.name
@@ -118,11 +168,8 @@ class ComplexType(Type):
             # Direct name match
             if self.name == other:
                 return True
-            # Check type hierarchy for assignability
-            from compiler_types.type_hierarchy import type_hierarchy
             # Get the base type (unbound generic) to match the type_hierarchy keys
-            base_type = type_registry.get_type(self.name)
-            return other in type_hierarchy.get(base_type, [])
+            return type_lattice().has_parent(type_registry.get_type(self.name), other)
         
         if not isinstance(other, ComplexType):
             return False
@@ -144,18 +191,22 @@ class ComplexType(Type):
     
     def get_field_type(self, field_name: str) -> Optional[Type]:
         """Get the type of a field by name."""
-        for name, field_type in self.fields:
-            if name == field_name:
-                return field_type
-        return None
+        return self._field_types.get(field_name)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class FunctionType(Type):
     """Function type like (String, Int) -> Bool."""
     parameter_types: tuple[Type, ...]
     return_type: Type
     
+    def _values(self) -> tuple:
+        return (self.parameter_types, self.return_type)
+    
+    def _interned(self) -> None:
+        object.__setattr__(self, "_free", _free_variables(self.parameter_types + (self.return_type,)))
+        super()._interned()
+    
     def __str__(self) -> str:
         if not self.parameter_types:
             return f"() -> {self.return_type}"
@@ -215,14 +266,46 @@ class BuiltinGenericTypes:
         return FunctionType(tuple(param_types), return_type)
 
 
+def _free_variables(types: Iterable[Any]) -> tuple[str, ...]:
+    names: dict[str, None] = {}
+    for t in types:
+        if isinstance(t, Type):
+            names.update(dict.fromkeys(t._free))
+    return tuple(names)
+
+
+# TypeSubstitution.apply's stand in for a variable that isn't substituted
+_UNBOUND = object()
+
+
 class TypeSubstitution:
     """Handles type variable substitution."""
     
-    def __init__(self, substitutions: Dict[str, Type]):
+    def __init__(self, substitutions: Dict[str, Type], memo: Optional[dict[tuple, Type]] = None):
         self.substitutions = substitutions
+        # (type, what its variables are substituted with) -> result, shared between substitutions.
+        # it holds on to whatever went through it, so give it a lifetime - Macrocosm has one per
+        # compilation. a global one would keep every user type ever substituted in alive
+        self.memo = memo
     
     def apply(self, type_expr: Type) -> Type:
         """Apply substitutions to a type expression."""
+        if not isinstance(type_expr, Type) or not type_expr._free:
+            return type_expr
+        if self.memo is None:
+            return self._apply(type_expr)
+        # only the variables that are in it matter, so it's cached under what those are bound to
+        key = (type_expr, tuple(self.substitutions.get(name, _UNBOUND) for name in type_expr._free))
+        try:
+            applied = self.memo.get(key)
+        except TypeError:
+            # something unhashable substituted in
+            return self._apply(type_expr)
+        if applied is None:
+            applied = self.memo[key] = self._apply(type_expr)
+        return applied
+
+    def _apply(self, type_expr: Type) -> Type:
         if isinstance(type_expr, TypeVariable):
             return self.substitutions.get(type_expr.name, type_expr)
         
@@ -265,6 +348,11 @@ class TypeRegistry:
         )
         self.types["dict"] = dict_type
     
+    def reset(self):
+        """Forget all user-defined types, keeping only the builtins."""
+        self.types.clear()
+        self._register_builtins()
+    
     def register_type(self, complex_type: ComplexType):
         """Register a type."""
         self.types[complex_type.name] = complex_type
@@ -304,6 +392,116 @@ class TypeRegistry:
 type_registry = TypeRegistry()
 
 
+class TypeLattice:
+    """
+    subtyping over the generated type_hierarchy (type -> its supertypes) and union_types (union ->
+    its members), answered without walking either of them.
+
+    every type that shows up in the two tables gets an integer id, and every id two bitsets: what it
+    inherits from, transitively and itself included, and what its union takes, transitively and
+    itself included. a query is then a couple of dict lookups and an AND. the types are whatever the
+    tables hold, names mostly but also the builtin Type objects - a PrimitiveType isn't equal to its
+    name, so they're ids of their own, like they're separate keys in the tables.
+
+    built once, by type_lattice().
+    """
+
+    def __init__(self, hierarchy: dict, unions: dict):
+        self.ids: dict[object, int] = {}
+        parents: list[list[int]] = []
+        members: list[list[int]] = []
+
+        def id_of(t: object) -> int:
+            i = self.ids.get(t)
+            if i is None:
+                i = self.ids[t] = len(parents)
+                parents.append([])
+                members.append([])
+            return i
+
+        for child, supertypes in hierarchy.items():
+            parents[id_of(child)].extend(id_of(t) for t in supertypes)
+        for union, union_members in unions.items():
+            members[id_of(union)].extend(id_of(t) for t in union_members)
+
+        self._parents = [_bits(ids) for ids in parents]
+        self._ancestors = _closure(parents)
+        self._members = _closure(members)
+
+    def extends(self, child: object, ancestor: object) -> bool:
+        """whether `child` is `ancestor` or inherits from it, along type_hierarchy only"""
+        c = self.ids.get(child)
+        a = self.ids.get(ancestor)
+        if c is None or a is None:
+            return child == ancestor
+        return bool(self._ancestors[c] >> a & 1)
+
+    def has_parent(self, child: object, parent: object) -> bool:
+        """whether type_hierarchy lists `parent` among `child`'s own supertypes"""
+        c = self.ids.get(child)
+        p = self.ids.get(parent)
+        return c is not None and p is not None and bool(self._parents[c] >> p & 1)
+
+    def is_subtype(self, child: object, parent: object) -> bool:
+        """
+        whether `child`, or something it inherits from, is `parent` or a member of it - unions
+        nest, so a member of a member counts too
+        """
+        if child == parent:
+            return True
+        c = self.ids.get(child)
+        p = self.ids.get(parent)
+        return c is not None and p is not None and bool(self._ancestors[c] & self._members[p])
+
+
+def _bits(ids: Iterable[int]) -> int:
+    bits = 0
+    for i in ids:
+        bits |= 1 << i
+    return bits
+
+
+def _closure(edges: list[list[int]]) -> list[int]:
+    """for every id, the bitset of the ids it reaches over `edges`, itself included"""
+    closure: list[int | None] = [None] * len(edges)
+    for root in range(len(edges)):
+        if closure[root] is not None:
+            continue
+        # postorder, so every id is done after everything it points at
+        stack = [(root, iter(edges[root]))]
+        on_stack = {root}
+        while stack:
+            i, pending = stack[-1]
+            j = next(pending, None)
+            if j is None:
+                stack.pop()
+                on_stack.discard(i)
+                bits = 1 << i
+                for k in edges[i]:
+                    bits |= closure[k]
+                closure[i] = bits
+            elif closure[j] is None:
+                assert j not in on_stack, "generated type tables have a cycle" # internal assert
+                stack.append((j, iter(edges[j])))
+                on_stack.add(j)
+    return closure
+
+
+_type_lattice: TypeLattice | None = None
+
+
+def type_lattice() -> TypeLattice:
+    """
+    the TypeLattice over the generated tables. they import this module, so it can't import them
+    up front - the first call does, the rest get it from here
+    """
+    global _type_lattice
+    if _type_lattice is None:
+        from .type_hierarchy import type_hierarchy, union_types
+        _type_lattice = TypeLattice(type_hierarchy, union_types)
+    return _type_lattice
+
+
 @dataclass(frozen=True)
 class TypeParameter:
     """Wrapper to distinguish type expressions from value expressions in typecheck results."""
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""the type interner: equal types are one object, however they come about, and only while used."""
+
+import copy
+import dataclasses
+import gc
+import pickle
+import sys
+import unittest
+import weakref
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from compiler_types import proper_types
+from compiler_types.proper_types import (
+    ComplexType, FunctionType, PrimitiveType, TypeSubstitution, TypeVariable, STRING, INT, type_registry,
+)
+
+
+def nested() -> ComplexType:
+    return ComplexType("list", (ComplexType("dict", (STRING, ComplexType("list", (PrimitiveType("int"),)))),))
+
+
+def interned_names() -> set[str]:
+    return {getattr(t, "name", None) for t in proper_types._interner.values()}
+
+
+class InternedTypesTest(unittest.TestCase):
+    def test_equal_constructions_are_identical(self):
+        self.assertIs(nested(), nested())
+        self.assertIs(ComplexType("dict", (STRING, INT)), ComplexType(name="dict", type_params=(STRING, INT), fields=()))
+        self.assertIs(PrimitiveType("str"), STRING)
+        self.assertIs(TypeVariable("T"), TypeVariable("T", ()))
+        self.assertIs(FunctionType((INT,), STRING), FunctionType(parameter_types=(INT,), return_type=STRING))
+        self.assertIsNot(ComplexType("dict", (STRING, INT)), ComplexType("dict", (INT, STRING)))
+        # a user type shell and the same type with fields filled in are different types
+        self.assertIsNot(ComplexType("Shell"), ComplexType("Shell", fields=(("x", INT),)))
+
+    def test_hash_is_the_dataclass_hash(self):
+        t = nested()
+        self.assertEqual(hash(t), hash((t.name, t.type_params, t.fields)))
+        self.assertEqual(hash(STRING), hash(("str",)))
+        self.assertEqual(hash(TypeVariable("K")), hash(("K", ())))
+        f = FunctionType((INT,), STRING)
+        self.assertEqual(hash(f), hash((f.parameter_types, f.return_type)))
+
+    def test_copies_come_back_interned(self):
+        # identity is equality, so a type that gets around the interner is equal to nothing.
+        # every way of copying one has to go through it
+        t = nested()
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            self.assertIs(pickle.loads(pickle.dumps(t, protocol=protocol)), t)
+        self.assertIs(copy.copy(t), t)
+        self.assertIs(copy.deepcopy(t), t)
+        self.assertIs(dataclasses.replace(t), t)
+        self.assertIs(dataclasses.replace(STRING, name="int"), INT)
+
+    def test_field_types(self):
+        t = ComplexType("Fielded", fields=(("x", INT), ("y", STRING), ("x", STRING)))
+        self.assertIs(t.get_field_type("x"), INT)
+        self.assertIs(t.get_field_type("y"), STRING)
+        self.assertIsNone(t.get_field_type("z"))
+
+    def test_substitution(self):
+        list_template = type_registry.get_type("list")
+        memo = {}
+        applied = TypeSubstitution({"T": STRING}, memo).apply(list_template)
+        self.assertIs(applied, type_registry.instantiate_generic("list", [STRING]))
+        self.assertIs(TypeSubstitution({"T": STRING}, memo).apply(list_template), applied)
+        self.assertIs(TypeSubstitution({"T": STRING}).apply(list_template), applied)
+        # nothing to substitute
+        self.assertIs(TypeSubstitution({"T": STRING}, memo).apply(INT), INT)
+        self.assertIs(TypeSubstitution({"U": STRING}, memo).apply(list_template), list_template)
+
+    def test_user_types_go_away(self):
+        list_template = type_registry.get_type("list")
+        for memoized in (False, True):
+            with self.subTest(memoized=memoized):
+                memo = {} if memoized else None
+                user_type = ComplexType("InternedTypesTestUser", fields=(("x", INT),))
+                applied = TypeSubstitution({"T": user_type}, memo).apply(list_template)
+                self.assertIs(applied.type_params[0], user_type)
+                alive = weakref.ref(user_type)
+                del user_type, applied, memo
+                gc.collect()
+                self.assertIsNone(alive())
+                self.assertNotIn("InternedTypesTestUser", interned_names())
+        # the template it went through is still there
+        self.assertIs(type_registry.get_type("list"), list_template)
+
+
+if __name__ == "__main__":
+    unittest.main()
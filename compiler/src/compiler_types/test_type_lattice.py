@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""TypeLattice against the recursive walks it replaced, over the real generated tables."""
+
+import random
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from compiler_types.proper_types import Type, PrimitiveType, ComplexType, type_registry, type_lattice
+from compiler_types.type_hierarchy import type_hierarchy, union_types
+
+# random pairs per property, on top of the exhaustive ones
+SAMPLES = 20000
+
+
+# the old checkers, verbatim but for the names
+
+
+def old_is_subtype(child, parent):
+    # only ever called with names here, so the Type, Type case that went to is_assignable_to is out
+    if isinstance(child, Type):
+        child = str(child)
+    if isinstance(parent, Type):
+        parent = str(parent)
+    if child == parent:
+        return True
+    if parent in union_types:
+        for member in union_types[parent]:
+            if old_is_subtype(child, member):
+                return True
+    if child not in type_hierarchy:
+        return False
+    for parent_type in type_hierarchy[child]:
+        if old_is_subtype(parent_type, parent):
+            return True
+    return False
+
+
+def old_is_transitive_subtype(current, target):
+    if current == target:
+        return True
+    if current in type_hierarchy:
+        return any(old_is_transitive_subtype(parent, target) for parent in type_hierarchy[current])
+    return False
+
+
+def old_primitive_assignable(self, other):
+    if isinstance(other, PrimitiveType):
+        if self.name == other.name:
+            return True
+        if self in type_hierarchy:
+            return other in type_hierarchy[self] or other.name in type_hierarchy[self] or any(
+                old_is_transitive_subtype(parent, other.name) for parent in type_hierarchy[self]
+            )
+    elif isinstance(other, str):
+        if self.name == other:
+            return True
+        if self in type_hierarchy:
+            return other in type_hierarchy[self] or any(
+                old_is_transitive_subtype(parent, other) for parent in type_hierarchy[self]
+            )
+    return False
+
+
+def old_complex_assignable_to_name(self, other):
+    if self.name == other:
+        return True
+    base_type = type_registry.get_type(self.name)
+    return other in type_hierarchy.get(base_type, [])
+
+
+def all_types() -> list:
+    types = set(type_hierarchy) | set(union_types)
+    types.update(t for supertypes in type_hierarchy.values() for t in supertypes)
+    types.update(t for members in union_types.values() for t in members)
+    return sorted(types, key=repr)
+
+
+# module level rather than setUpClass, ./test calls the test methods on a bare instance
+TYPES = all_types()
+NAMES = [t for t in TYPES if isinstance(t, str)]
+
+
+def related_pairs(rng: random.Random):
+    """(child, parent) pairs the old checker mostly says yes to: up the hierarchy, then into a union"""
+    unions_of = {}
+    for union, members in union_types.items():
+        for member in members:
+            unions_of.setdefault(member, []).append(union)
+    for _ in range(SAMPLES):
+        child = rng.choice(NAMES)
+        parent = child
+        while parent in type_hierarchy and rng.random() < 0.8:
+            parent = rng.choice(type_hierarchy[parent])
+        while parent in unions_of and rng.random() < 0.8:
+            parent = rng.choice(unions_of[parent])
+        yield child, parent
+
+
+class TypeLatticeTest(unittest.TestCase):
+    def test_is_subtype(self):
+        lattice = type_lattice()
+        rng = random.Random(67)
+        pairs = list(related_pairs(rng))
+        pairs += [(rng.choice(NAMES), rng.choice(NAMES)) for _ in range(SAMPLES)]
+        pairs += [(name, name + "?") for name in NAMES[:100]]
+        positives = 0
+        for child, parent in pairs:
+            expected = old_is_subtype(child, parent)
+            positives += expected
+            self.assertEqual(lattice.is_subtype(child, parent), expected, f"{child!r} <: {parent!r}")
+        # the related pairs are there to get these
+        self.assertGreater(positives, SAMPLES // 2)
+
+    def test_primitive_assignable(self):
+        primitives = [t for t in TYPES if isinstance(t, PrimitiveType)]
+        for primitive in primitives:
+            for other in TYPES:
+                if isinstance(other, (str, PrimitiveType)):
+                    self.assertEqual(primitive.is_assignable_to(other), old_primitive_assignable(primitive, other),
+                                     f"{primitive!r} -> {other!r}")
+                if isinstance(other, str):
+                    named = PrimitiveType(other)
+                    self.assertEqual(primitive.is_assignable_to(named), old_primitive_assignable(primitive, named),
+                                     f"{primitive!r} -> {named!r}")
+
+    def test_complex_assignable_to_name(self):
+        rng = random.Random(67)
+        complexes = [t for t in TYPES if isinstance(t, ComplexType)]
+        complexes += [ComplexType(name) for name in rng.sample(NAMES, 100)]
+        for complex_type in complexes:
+            for name in NAMES:
+                self.assertEqual(complex_type.is_assignable_to(name), old_complex_assignable_to_name(complex_type, name),
+                                 f"{complex_type!r} -> {name!r}")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import sys
 from dataclasses import dataclass, replace
 from io import StringIO
 from typing import TYPE_CHECKING, Callable, Union, TypeVar, Protocol, cast, Any
@@ -9,6 +10,7 @@ from utils.logger import default_logger
 if TYPE_CHECKING:
     from processor import MacroProcessingStep
     from macrocosm import Macrocosm
+    from collections.abc import Iterable
 
 # TODO - this shouldn't be here, probably...
 @dataclass(kw_only=True)
@@ -37,6 +39,9 @@ class Macro_emission_provider(Protocol):
 class Macro_code_linking_provider(Protocol):
     def code_linking(self, ctx: MacroContext): ...
 
+class HandlerWrapper(Protocol):
+    def wrap(self, step: str, macro: str, handler: Callable) -> Callable: ...
+
 Macro_provider = \
     Macro_preprocess_provider | \
     Macro_typecheck_provider | \
@@ -50,18 +55,41 @@ F = TypeVar("F", bound=Callable[..., Any])
 class MacroRegistry:
     def __init__(self) -> None:
         self._registry: dict[str, Macro] = {}
+        self._frozen: dict[str, Macro] | None = None
 
     def add_fn(self, m: Macro | None, *names: str):
         if m is None:
             return
+        assert self._frozen is None, "registry already frozen into a dispatch table" # internal assert
         for name in names:
             self._registry[name] = m
 
+    def freeze(self) -> dict[str, Macro]:
+        """
+        the dispatch table steps look handlers up in, one per registry no matter how many steps
+        ask, and no more adding after this. it's shared, so read it and never write it - a
+        MappingProxyType would say so louder but makes every .get() twice as slow.
+        keys are interned like Node.macro is, so a lookup mostly gets away with comparing pointers
+        """
+        if self._frozen is None:
+            self._frozen = {sys.intern(name): m for name, m in self._registry.items()}
+        return self._frozen
+
+    def wrapped(self, step: str, wrappers: "Iterable[HandlerWrapper]") -> dict[str, Macro]:
+        """
+        freeze(), but every handler passed through each wrapper's `wrap(step, macro, handler)` in
+        turn (CompileProfiler, Tracer). a table of its own, the shared one stays as is
+        """
+        table = self.freeze()
+        for wrapper in wrappers:
+            table = {name: wrapper.wrap(step, name, m) for name, m in table.items()}
+        return table
+
     def get(self, name: str) -> Macro:
         try:
             return self._registry[name]
         except KeyError:
-            default_logger.macro(f"ERROR: unknown macro '{name}'")
+            default_logger.macro("ERROR: unknown macro '{}'", name)
             raise ValueError(f"Unknown macro: {name}")
 
     def all(self) -> dict[str, Macro]:
@@ -1,5 +1,5 @@
-from contextlib import contextmanager
-from typing import Any, Sequence
+from contextlib import nullcontext
+from typing import Any, Iterable, Sequence
 from io import StringIO
 from macros.noscope_macro import Noscope_macro_provider
 from macros.collection_macros import List_macro_provider, Dict_macro_provider
@@ -23,7 +23,7 @@ from macros.type_macro import Type_macro_provider # Added import
 from macros.try_catch_macro import Try_macro_provider, Catch_macro_provider, Finally_macro_provider, Throw_macro_provider
 from macros.bind_macro import Bind_macro_provider
 from macros.obtain_param_value_macro import Obtain_param_value_macro_provider
-from core.node import Node, Position, Macro, Args
+from core.node import Node, Position, FieldDemandType, ResolvedConvention, SaneIdentifier, tree_observers
 from utils.strutil import IndentedStringIO, Joiner
 from pipeline.steps import MacroProcessingStep
 from core.exceptions import MacroAssertFailed
@@ -35,11 +35,27 @@ from pipeline.steps import TypeCheckingStep
 from pipeline.steps import TypeRegistrationStep
 from pipeline.steps.type_registration import TypeDetailRegistrationStep
 from pipeline.steps import MustCompileErrorVerificationStep
+from pipeline.steps import FusedSparseSteps, schedule_steps
+from pipeline.local_lookup import ScopeTable
 from pipeline.steps import JavaScriptEmissionStep
 from utils.logger import default_logger
+from utils.utils import TypeMap
+from utils.profiler import CompileProfiler, stage
+
+# stands in for "no value" in the metadata tables, None is a legitimate value
+_MISSING = object()
+
+# metadata that's worked out from the tree rather than decided once, and so goes stale when the
+# tree changes under it (see Macrocosm.tree_changed). everything else - identifiers, params,
+# injected code - belongs to its node and survives the node being moved around.
+# computed from the node's own children:
+SUBTREE_DERIVED_METADATA = (FieldDemandType, ResolvedConvention)
+# computed from what the upwalker finds, i.e. earlier siblings of the node and of its ancestors,
+# and what's inside those:
+SCOPE_DERIVED_METADATA = (ResolvedConvention,)
 
 class Macrocosm:
-    def __init__(self, emission_registry: MacroRegistry, typecheck_registry: MacroRegistry, code_linking_registry: MacroRegistry, preprocess_registry: MacroRegistry, type_registration_registry: MacroRegistry, type_detail_registration_registry: MacroRegistry):
+    def __init__(self, emission_registry: MacroRegistry, typecheck_registry: MacroRegistry, code_linking_registry: MacroRegistry, preprocess_registry: MacroRegistry, type_registration_registry: MacroRegistry, type_detail_registration_registry: MacroRegistry, profiler: CompileProfiler | None = None):
         self.nodes: list[Node] = []
         # TODO. incremental is good enough for now, but we'll have to stabilize it.
         #  the last thing you would want is the entire output changing because you added a statement. that's a lot of
@@ -49,15 +65,30 @@ class Macrocosm:
         self.compile_errors: list[dict[str, Any]] = []
         self._js_output: str = ""
         
-        # Metadata is now stored directly on Node objects via setattr
+        # metadata type -> node -> value. one table per type, so invalidating a subtree doesn't
+        # have to care what a node happens to carry. `Node.macro`/`Node.args` live on the node
+        self._metadata: dict[type, dict[Node, Any]] = {}
 
         # Dynamic call conventions for user-defined types
         self._dynamic_conventions: dict[str, list[Any]] = {}
 
+        # (call name, argument types) -> BuiltinResolution, see Call_macro_provider. per compilation,
+        # user types have a say in what's assignable to what
+        self.overload_cache: dict[tuple, Any] = {}
+        # TypeSubstitution's memo. per compilation too, so the user types in it don't outlive it
+        self.substitution_cache: dict[tuple, Any] = {}
+
         self.root_node: Node | None = None
+
+        # macro -> (preorder position, node) for every node under root_node, see nodes_with_macros.
+        # None until somebody asks, and again after any edit
+        self._macro_index: dict[str, list[tuple[int, Node]]] | None = None
+
+        # node -> what its children define, for the upwalker. see pipeline/local_lookup.py
+        self._scope_tables: dict[Node, ScopeTable] = {}
         
         # Initialize the processing pipeline
-        self.processing_steps: list[MacroProcessingStep] = [
+        steps: list[MacroProcessingStep] = [
             CodeBlockLinkingStep(code_linking_registry), 
             PreprocessingStep(preprocess_registry),
             TypeRegistrationStep(type_registration_registry),     # Pass 1: Register basic type shells
@@ -66,9 +97,25 @@ class Macrocosm:
             JavaScriptEmissionStep(emission_registry),
             MustCompileErrorVerificationStep()
         ]
+        # in dependency order, the two registration passes fused into one lookup, see schedule_steps
+        self.processing_steps: list[MacroProcessingStep] = schedule_steps(steps)
+
+        # times the steps and every handler call, see utils/profiler.py. the tracer (utils/tracer.py)
+        # rides on the logger, but the handler spans need the handlers wrapped all the same
+        self.profiler = profiler
+        wrappers = [wrapper for wrapper in (profiler, default_logger.tracer) if wrapper is not None]
+        if wrappers:
+            for step in steps:
+                step.dispatch = step.macros.wrapped(step.name, wrappers)
 
         self.registries: dict[str, MacroRegistry] = {}
 
+        # subtree pruning, see worth_visiting. every step gets a bit, every macro a mask of the
+        # steps that want it, and every node a mask of the steps that want something in its subtree
+        self._step_bits: dict[MacroProcessingStep, int] = {step: 1 << i for i, step in enumerate(steps)}
+        self._macro_masks: dict[str, int] = {}
+        self._subtree_masks: dict[Node, int] = {}
+
     def get_new_ident(self, name: str | None):
         ident = f"_{hex(self.incremental_id)}"
         if name:
@@ -76,62 +123,181 @@ class Macrocosm:
         self.incremental_id += 1
         return ident
 
+    def _lookup_metadata(self, node: Node, metadata_type: type) -> Any:
+        table = self._metadata.get(metadata_type)
+        value = _MISSING if table is None else table.get(node, _MISSING)
+        if value is _MISSING:
+            # Check if there's a default factory from the old TypeMap system
+            factory = TypeMap._default_factories.get(metadata_type)
+            if factory is not None:
+                value = factory()
+                self.set_metadata(node, metadata_type, value)
+        return value
+
     def get_metadata(self, node: Node, metadata_type: type):
-        """Get metadata for a node, auto-computing Macro and Args if missing"""
-        default_logger.log("metadata", f"get metadata {str(metadata_type)} for {id(node)} {node.content}")
-        
-        # Use getattr to retrieve metadata directly from the node object
-        attr_name = f"_metadata_{metadata_type.__name__}"
-        
-        # Auto-compute Macro and Args if not present
-        if metadata_type in [Macro, Args] and not hasattr(node, attr_name):
-            self._ensure_macro_args_computed(node)
-        
-        if hasattr(node, attr_name):
-            return getattr(node, attr_name)
-        
-        # Check if there's a default factory from the old TypeMap system
-        from utils.utils import TypeMap
-        if metadata_type in TypeMap._default_factories:
-            value = TypeMap._default_factories[metadata_type]()
-            self.set_metadata(node, metadata_type, value)
-            return value
-        
-        raise KeyError(f"No metadata of type {metadata_type} for node")
+        """Get metadata for a node, creating it if the type has a default factory"""
+        value = self._lookup_metadata(node, metadata_type)
+        if value is _MISSING:
+            raise KeyError(f"No metadata of type {metadata_type} for node")
+        return value
 
     def maybe_metadata(self, node: Node, metadata_type: type):
         """Get metadata for a node if it exists, return None otherwise"""
-        try:
-            return self.get_metadata(node, metadata_type)
-        except KeyError:
-            return None
+        value = self._lookup_metadata(node, metadata_type)
+        return None if value is _MISSING else value
 
     def set_metadata(self, node: Node, metadata_type: type, value: Any):
         """Set metadata for a node"""
-        # Use setattr to store metadata directly on the node object
-        attr_name = f"_metadata_{metadata_type.__name__}"
-        setattr(node, attr_name, value)
-        default_logger.log("metadata", f"set metadata {str(metadata_type)} {str(value)} for {id(node)} {node.content}")
+        table = self._metadata.get(metadata_type)
+        if table is None:
+            table = self._metadata[metadata_type] = {}
+        table[node] = value
+        if metadata_type is SaneIdentifier:
+            # locals are in scope tables under their sane name too
+            self._definition_changed(node)
+        default_logger.metadata("set metadata {} {} for {} {}", metadata_type, value, id(node), node.content)
 
     def invalidate_metadata(self, node: Node):
         """Invalidate metadata for a node and all its descendants when tree changes"""
-        # Remove all metadata attributes from the node
-        attrs_to_remove = [attr for attr in dir(node) if attr.startswith('_metadata_')]
-        for attr in attrs_to_remove:
-            delattr(node, attr)
-        
-        # Recursively invalidate children
-        for child in node.children:
-            self.invalidate_metadata(child)
-
-    def _ensure_macro_args_computed(self, node: Node):
-        """Ensure Macro and Args metadata is computed for a node"""
-        from core.node import Macro, Args
-        from utils.strutil import cut
-        
-        macro, args = cut(node.content, " ")
-        self.set_metadata(node, Macro, macro)
-        self.set_metadata(node, Args, args)
+        subtree = [node]
+        for n in subtree:
+            subtree.extend(n.child_view)
+        for table in self._metadata.values():
+            for n in subtree:
+                table.pop(n, None)
+        self._definition_changed(node)
+
+    def tree_changed(self, parent: Node, index: int, inserted: Node | None) -> None:
+        """
+        keeps the subtree masks wide enough and drops the derived metadata an edit of `parent`'s
+        children at `index` could have changed
+        """
+        self._macro_index = None
+        if self._scope_tables:
+            scope_table = self._scope_tables.get(parent)
+            if scope_table is not None:
+                scope_table.cut(index)
+            # `parent` may be a local that's a pipeline result now (or no longer), or a noscope
+            # defining different things
+            self._definition_changed(parent)
+
+        if inserted is not None and parent in self._subtree_masks:
+            # masks only ever widen. a removal leaves them wider than needed, which prunes less but
+            # is never wrong. a parent without a mask has none of its ancestors' either
+            bits = self._subtree_mask(inserted)
+            node = parent
+            while node is not None:
+                mask = self._subtree_masks.get(node)
+                if mask is None or mask | bits == mask:
+                    break
+                self._subtree_masks[node] = mask | bits
+                node = node.parent
+
+        subtree_tables = [self._metadata[t] for t in SUBTREE_DERIVED_METADATA if self._metadata.get(t)]
+        scope_tables = [self._metadata[t] for t in SCOPE_DERIVED_METADATA if self._metadata.get(t)]
+        # the usual case: preprocessing and linking edit the tree before anything got derived
+        if not subtree_tables and not scope_tables:
+            return
+
+        node = parent
+        while node is not None:
+            for table in subtree_tables:
+                table.pop(node, None)
+            node = node.parent
+
+        if not scope_tables:
+            return
+        # whatever comes after the edit in the document may have found something different
+        # looking back: the children from `index` on, then the later siblings of every ancestor
+        level, start = parent, index
+        while True:
+            stack = level.child_view[start:]
+            while stack:
+                node = stack.pop()
+                for table in scope_tables:
+                    table.pop(node, None)
+                stack.extend(node.child_view)
+            if level.parent is None:
+                break
+            start = level.parent.index_of_child(level) + 1
+            level = level.parent
+
+    def scope_table(self, node: Node) -> ScopeTable:
+        """what `node`'s children define, see pipeline/local_lookup.py"""
+        table = self._scope_tables.get(node)
+        if table is None:
+            table = self._scope_tables[node] = ScopeTable(self, node)
+        return table
+
+    def _definition_changed(self, node: Node) -> None:
+        """
+        cuts back the scope tables `node` might be in: its parent's, and its grandparent's in case
+        the parent is a noscope, whose children define things there
+        """
+        level = node
+        for _ in range(2):
+            parent = level.parent
+            if parent is None:
+                return
+            table = self._scope_tables.get(parent)
+            if table is not None:
+                try:
+                    table.cut(parent.index_of_child(level))
+                except ValueError:
+                    table.cut(0)
+            level = parent
+
+    def worth_visiting(self, node: Node, step: MacroProcessingStep) -> bool:
+        """False if `step` wants none of the macros in `node`'s subtree, see MacroProcessingStep.wants"""
+        return bool(self._subtree_mask(node) & self._step_bits[step])
+
+    def _subtree_mask(self, node: Node) -> int:
+        masks = self._subtree_masks
+        mask = masks.get(node)
+        if mask is not None:
+            return mask
+        # postorder, stopping at subtrees that already have theirs
+        stack = [(node, False)]
+        while stack:
+            current, children_done = stack.pop()
+            if children_done:
+                mask = self._macro_mask(current.macro)
+                for child in current.child_view:
+                    mask |= masks[child]
+                masks[current] = mask
+            elif current not in masks:
+                stack.append((current, True))
+                stack.extend((child, False) for child in current.child_view)
+        return masks[node]
+
+    def _macro_mask(self, macro: str) -> int:
+        mask = self._macro_masks.get(macro)
+        if mask is None:
+            mask = 0
+            for step, bit in self._step_bits.items():
+                if step.wants(macro):
+                    mask |= bit
+            self._macro_masks[macro] = mask
+        return mask
+
+    def nodes_with_macros(self, macros: Iterable[str]) -> list[Node]:
+        """every node under root_node whose macro is one of `macros`, in document order"""
+        if self._macro_index is None:
+            # all the edits happen in linking and preprocessing, so in practice this walk happens
+            # once per compile, when the first sparse step asks
+            with stage(self.profiler, "macro index"):
+                self._macro_index = {}
+                stack = [self.root_node]
+                position = 0
+                while stack:
+                    node = stack.pop()
+                    self._macro_index.setdefault(node.macro, []).append((position, node))
+                    position += 1
+                    stack.extend(reversed(node.child_view))
+        matches = [match for macro in macros for match in self._macro_index.get(macro, ())]
+        # positions are unique, so the sort never gets as far as comparing nodes
+        matches.sort()
+        return [node for _, node in matches]
 
     def register(self, node: Node):
         self.nodes.append(node)
@@ -160,42 +326,34 @@ class Macrocosm:
         self.compile_errors.append(entry)
 
     def compile(self):
-        # Discover macros first
-        with default_logger.indent("compile", "discovering macros"):
-            for node in self.nodes:
-                self.__discover_macros(node)
-            
         solution_node = self.make_node("67lang:solution", Position(0, 0), self.nodes or [])
         self.root_node = solution_node
             
         # Execute the processing pipeline
-        for step in self.processing_steps:
-            step_name = step.__class__.__name__
-            with default_logger.indent("compile", f"processing step: {step_name}"):
-                ctx = MacroContext(
-                    statement_out=StringIO(),  # dummy for non-emission steps
-                    expression_out=StringIO(),
-                    node=solution_node,
-                    compiler=self,
-                    current_step=step,
-                )
-                step.process_node(ctx)
+        tree_observers.append(self)
+        try:
+            for step in self.processing_steps:
+                # a fused run times each of its steps itself
+                timed = nullcontext() if isinstance(step, FusedSparseSteps) else stage(self.profiler, step.name)
+                with default_logger.indent("compile", "processing step: {}", step.name), timed:
+                    ctx = MacroContext(
+                        statement_out=StringIO(),  # dummy for non-emission steps
+                        expression_out=StringIO(),
+                        node=solution_node,
+                        compiler=self,
+                        current_step=step,
+                    )
+                    step.process_node(ctx)
+        finally:
+            tree_observers.remove(self)
         
         if len(self.compile_errors) != 0:
             return "" # TODO - raise an error instead ?
         
         return self._js_output
 
-    def __discover_macros(self, node: Node):
-        # TODO lstring macros should perhaps get special handling here...
-        self._ensure_macro_args_computed(node)
-        for child in node.children:
-            self.__discover_macros(child)
-
     def make_node(self, content: str, pos: Position, children: None | list[Node]) -> Node:
-        n = Node(content, pos, children)
-        self.__discover_macros(n)
-        return n
+        return Node(content, pos, children)
 
     def add_dynamic_convention(self, name: str, convention: Any):
         if name not in self._dynamic_conventions:
@@ -228,22 +386,29 @@ class Macrocosm:
             ctx.expression_out.write(ident_value)
 
     @property
-    def safely(self):
-        @contextmanager
-        def _safely():
-            try:
-                yield
-            except MacroAssertFailed:
-                pass
-        return _safely()
-
-def create_macrocosm() -> Macrocosm:
-    # creates it with all the necessary macros registered
+    def safely(self) -> "_Safely":
+        return _SAFELY
+
+class _Safely:
+    """
+    swallows MacroAssertFailed, the compile error is on the list by the time it's raised.
+    keeps no state, so the one instance serves every `with compiler.safely` there is
+    """
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return exc_type is not None and issubclass(exc_type, MacroAssertFailed)
+
+_SAFELY = _Safely()
+
+def create_registries() -> dict[str, MacroRegistry]:
+    # builds the per-step macro registries. providers keep no per-compilation state,
+    # so one set of registries can back any number of Macrocosm instances
     
     def has_arguments(ctx: MacroContext) -> bool:
         """Matcher function: returns True if the macro has arguments"""
-        from core.node import Args
-        args = ctx.compiler.get_metadata(ctx.node, Args)
+        args = ctx.node.args
         return bool(args.strip())
     
     macro_providers: dict[str, Macro_provider] = {
@@ -323,7 +488,7 @@ def create_macrocosm() -> Macrocosm:
         macro_providers[k] = Literal_macro_provider(value, type_name)
 
     for name, provider in macro_providers.items():
-        default_logger.registry(f"registering macro '{name}' -> {provider.__class__.__name__}")
+        default_logger.registry("registering macro '{}' -> {}", name, provider.__class__.__name__)
 
     registries = {}
     def create_registry(name: str):
@@ -356,7 +521,24 @@ def create_macrocosm() -> Macrocosm:
         type_detail_registration.add_fn(getattr(provider, "register_type_details", None), macro)
         code_linking_registry.add_fn(getattr(provider, "code_linking", None), macro)  
     
-    rv = Macrocosm(emission, typecheck, code_linking_registry, preprocess, type_registration, type_detail_registration)
+    default_logger.registry(lambda: f"macro registry initialized with codegen macros: {', '.join(emission.all().keys())}")
+    default_logger.registry(lambda: f"typecheck registry initialized with typecheck macros: {', '.join(typecheck.all().keys())}")
+    default_logger.registry(lambda: f"preprocessor registry initialized with preprocessor macros: {', '.join(preprocess.all().keys())}")
+    return registries
+
+def create_macrocosm(registries: dict[str, MacroRegistry] | None = None, profiler: CompileProfiler | None = None) -> Macrocosm:
+    # creates it with all the necessary macros registered
+    if registries is None:
+        registries = create_registries()
+    rv = Macrocosm(
+        registries["emission"],
+        registries["typecheck"],
+        registries["code_linking"],
+        registries["preprocess"],
+        registries["type_registration"],
+        registries["type_detail_registration"],
+        profiler,
+    )
     rv.registries.update(registries)
     return rv
     
\ No newline at end of file
@@ -1,53 +1,199 @@
 from __future__ import annotations
 
+import sys
 from dataclasses import dataclass, field
-from typing import Any, Sequence, Union
+from collections.abc import Iterator, Sequence
+from typing import Any, Protocol, Union
 
 # Keep TypeMap import for backwards compatibility with existing registrations
 from utils.utils import TypeMap
+from utils.strutil import cut
 
 
-@dataclass
-class Position:
-    line: int
-    char: int = 0
+_CHAR_BITS = 20
+
+class Position(int):
+    """
+    line and char packed into a single int. nodes keep only the bare int (see Node._pos).
+    immutable, and always truthy like the dataclass it replaced (even at 0:0).
+    """
+    __slots__ = ()
+
+    def __new__(cls, line: int, char: int = 0) -> "Position":
+        assert 0 <= char < (1 << _CHAR_BITS) and line >= 0  # internal assert
+        return super().__new__(cls, (line << _CHAR_BITS) | char)
+
+    @property
+    def line(self) -> int:
+        return int(self) >> _CHAR_BITS
+
+    @property
+    def char(self) -> int:
+        return int(self) & ((1 << _CHAR_BITS) - 1)
+
+    def __bool__(self) -> bool:
+        return True
+
+    @classmethod
+    def _from_packed(cls, packed: int) -> "Position":
+        return int.__new__(cls, packed)
+
+    def __getnewargs__(self) -> tuple[int, int]:
+        # int's own would hand the packed value to __new__ as the line
+        return (self.line, self.char)
+
+    def __repr__(self) -> str:
+        return f"Position(line={self.line}, char={self.char})"
+
+class ChildView(Sequence["Node"]):
+    """
+    read-only live view of a node's children, for walking them without copying the list.
+    iterating one while the children change raises, like a dict would. if the loop body is
+    going to move children around, iterate over the `children` copy instead.
+    """
+    __slots__ = ("_node",)
+
+    def __init__(self, node: "Node") -> None:
+        self._node = node
+
+    def __len__(self) -> int:
+        return len(self._node._children)
+
+    def __getitem__(self, index):
+        # a slice comes back as a plain list, i.e. a copy
+        return self._node._children[index]
+
+    def __iter__(self) -> Iterator["Node"]:
+        node = self._node
+        version = node._version
+        for child in node._children:
+            if node._version != version:
+                raise RuntimeError(f"children of {node.content!r} changed during iteration")
+            yield child
+
+    def __reversed__(self) -> Iterator["Node"]:
+        node = self._node
+        version = node._version
+        for child in reversed(node._children):
+            if node._version != version:
+                raise RuntimeError(f"children of {node.content!r} changed during iteration")
+            yield child
+
+    def __contains__(self, value: object) -> bool:
+        return any(child is value for child in self._node._children)
+
+    def index(self, value: "Node", start: int = 0, stop: int | None = None) -> int:
+        if start == 0 and stop is None:
+            return self._node.index_of_child(value)
+        # Node has no __eq__, so list.index already goes by identity
+        return self._node._children.index(value, start, len(self) if stop is None else stop)
+
+    def __repr__(self) -> str:
+        return f"ChildView({[child.content for child in self._node._children]!r})"
+
+class TreeObserver(Protocol):
+    def tree_changed(self, parent: "Node", index: int, inserted: "Node | None") -> None:
+        """`parent` got a child inserted (`inserted`), removed (None) or replaced at `index`"""
+        ...
+
+# told about every edit of any tree. the Macrocosm is on here for the duration of a compile,
+# see Macrocosm.tree_changed
+tree_observers: list[TreeObserver] = []
 
 class Node:
+    # there's one of these per line of source, so no per-instance __dict__.
+    # metadata lives in side tables on the Macrocosm, except for `macro`/`args` which every pass reads
+    # `_pos` is the packed Position as a plain int, it's a lot smaller than the Position object
+    # `_version` goes up on every change to `_children`, see ChildView
+    # `_index` is where this node sits in its parent's `_children` (offset by the parent's `_base`),
+    # see index_of_child
+    __slots__ = ("content", "macro", "args", "_children", "parent", "_pos", "_version", "_index", "_base", "_numbered")
+
     def __init__(self, content: str | None, pos: Position | None, children: list["Node"] | None) -> None:
+        # content never changes after this, so neither do these. make a new node instead
         self.content = content or ""
+        # TODO lstring macros should perhaps get special handling here...
+        macro, self.args = cut(self.content, " ")
+        # a handful of distinct macro names across every node, share the strings
+        self.macro = sys.intern(macro)
         self._children: list[Node] = children or []
         self.parent: Node | None = None
-        for child in self._children:
+        self._base = 0
+        for i, child in enumerate(self._children):
             child.parent = self
+            child._index = i
+        self._numbered = len(self._children)
+        self._index = 0
         self.pos = pos
+        self._version = 0
+
+    @property
+    def pos(self) -> Position | None:
+        packed = self._pos
+        return None if packed is None else Position._from_packed(packed)
+
+    @pos.setter
+    def pos(self, pos: Position | None) -> None:
+        self._pos = None if pos is None else int(pos)
 
     @property
     def children(self) -> Sequence["Node"]:
+        """a copy, safe to hold on to or to iterate while moving children around"""
         return list(self._children)
 
+    @property
+    def child_view(self) -> ChildView:
+        """the children without a copy. see ChildView"""
+        return ChildView(self)
+
+    def index_of_child(self, child: "Node") -> int:
+        """
+        position of `child` among the children. O(1) if its `_index` is still good, otherwise it
+        renumbers forward from the last edit up to the child, so editing and then looking up
+        nearby (code block linking, hoisting, the upwalker) stays cheap.
+        """
+        children = self._children
+        index = child._index - self._base
+        if 0 <= index < len(children) and children[index] is child:
+            return index
+        for index in range(self._numbered, len(children)):
+            children[index]._index = self._base + index
+            self._numbered = index + 1
+            if children[index] is child:
+                return index
+        # a stale hint inside the numbered part means a second parent renumbered it, start over
+        self._renumber()
+        index = child._index
+        if 0 <= index < len(children) and children[index] is child:
+            return index
+        raise ValueError("target child not found")
+
+    def _renumber(self) -> None:
+        self._base = 0
+        for i, child in enumerate(self._children):
+            child._index = i
+        self._numbered = len(self._children)
+
     def replace_child(self, target: "Node", new: Union["Node", list["Node"], None]) -> None:
-        matches = [i for i, child in enumerate(self._children) if child is target]
-        if not matches:
-            raise ValueError("target child not found")
-        if len(matches) > 1:
-            raise ValueError("target child appears multiple times")
-
-        index = matches[0]
-        # detach old
-        self._children.remove(target)
+        index = self.index_of_child(target)
         target.parent = None
-        self.__insert_child(index, new)
-        
-        # Notify about tree changes for metadata invalidation
-        self._notify_tree_change()
+        if isinstance(new, Node) and new.parent is not self:
+            # one for one, so nobody else moves and every index stays good
+            new._detach()
+            new.parent = self
+            new._index = self._base + index
+            self._children[index] = new
+            self._version += 1
+            self._notify_tree_change(index, new)
+        else:
+            self._remove_at(index)
+            self.__insert_child(index, new)
 
     def append_child(self, new: Node | list[Node] | None):
         self.__insert_child(len(self._children), new)
-        self._notify_tree_change()
 
     def prepend_child(self, new: Node | list[Node] | None):
         self.__insert_child(0, new)
-        self._notify_tree_change()
 
     def __insert_child(self, index: int, new: Node | list[Node] | None):
         # prepare new children
@@ -60,18 +206,53 @@ class Node:
 
         for child in reversed(replacement):
             assert isinstance(child, Node) # internal assert
-            if child.parent:
-                # Detach from old parent
-                if child in child.parent._children:
-                    child.parent._children.remove(child)
-                child.parent = None
+            child._detach()
             child.parent = self
-            self._children.insert(index, child)
+            self._insert_at(index, child)
+
+    def _detach(self) -> None:
+        parent = self.parent
+        if parent is None:
+            return
+        try:
+            index = parent.index_of_child(self)
+        except ValueError:
+            # a parent pointer without the matching entry, e.g. a node handed to a second parent's constructor
+            pass
+        else:
+            parent._remove_at(index)
+        self.parent = None
+
+    # `_index` is only a hint, index_of_child checks it before trusting it. the first `_numbered`
+    # children are known to have good ones. the front of the list moves by shifting `_base` instead,
+    # so prepends (hoisting) and detaching the first child keep every index good, appends only
+    # touch the new child, and an edit in the middle pulls `_numbered` back to the edit
+
+    def _insert_at(self, index: int, child: "Node") -> None:
+        if index == 0:
+            self._base -= 1
+            self._numbered += 1
+        else:
+            self._numbered = min(self._numbered, index)
+        child._index = self._base + index
+        self._children.insert(index, child)
+        self._version += 1
+        self._notify_tree_change(index, child)
+
+    def _remove_at(self, index: int) -> None:
+        del self._children[index]
+        if index == 0:
+            self._base += 1
+            self._numbered = max(self._numbered - 1, 0)
+        else:
+            self._numbered = min(self._numbered, index)
+        self._version += 1
+        self._notify_tree_change(index, None)
 
-    def _notify_tree_change(self):
-        """Hook for notifying about tree changes - to be implemented by compiler"""
-        # This will be used by the compiler to invalidate metadata
-        pass
+    def _notify_tree_change(self, index: int, inserted: "Node | None") -> None:
+        # every edit of `_children` ends up here, detaching from an old parent included
+        for observer in tree_observers:
+            observer.tree_changed(self, index, inserted)
 
     def __repr__(self) -> str:
         return self.indented_repr()
@@ -84,11 +265,8 @@ class Node:
 
     def copy_recursive(self) -> "Node":
         """Create a recursive copy of this node and all its children."""
-        new_node = Node(self.content, self.pos, [])
-        for child in self._children:
-            new_node._children.append(child.copy_recursive())
-            new_node._children[-1].parent = new_node
-        return new_node
+        # through the constructor, which numbers the children
+        return Node(self.content, self.pos, [child.copy_recursive() for child in self._children])
 
 @dataclass
 class Indexers:
@@ -115,8 +293,6 @@ def __params(): return Params()
 class Inject_code_start:
     code: list[str] = field(default_factory=list)
 
-class Macro(str): pass
-class Args(str): pass
 class SaneIdentifier(str): pass
 
 @dataclass  
@@ -128,5 +304,14 @@ class TypeFieldNames:
 
 @dataclass 
 class ResolvedConvention:
-    """Stores the resolved calling convention for a function call"""
+    """
+    the resolved calling convention for a function call, and what resolving it worked out about
+    the call - typechecking and emission both go by this instead of unifying all over again
+    """
     convention: Any = None  # Will hold PrototypeCall or DirectCall
+    # type variable name -> the type this call binds it to. empty if the demands had none
+    substitutions: dict[str, Any] = field(default_factory=dict)
+    # convention.demands with the substitutions applied
+    unified_demands: list[Any] | None = None
+    # convention.returns with the substitutions applied, "*" when it returns nothing in particular
+    returns: Any = "*"
@@ -0,0 +1,95 @@
+"""
+content addressed cache of parsed files.
+
+entries are marshalled `FlatTree`s named after a hash of the parser's fingerprint plus the file
+contents, so an edited file or an edited parser simply misses. the directory is bounded: when it
+grows past `max_bytes`, the least recently used entries (by mtime, bumped on every hit) go first.
+
+a directory that can't be read or written (read-only checkout) is a cache that never hits.
+"""
+
+import hashlib
+import marshal
+import os
+from functools import cache
+from pathlib import Path
+
+from core.tree_parser import FlatTree
+from utils.logger import default_logger
+from utils.cache import CACHE_DIR, fingerprint, try_write_bytes
+
+PARSE_CACHE_DIR = CACHE_DIR / "parse"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+_ENTRY_SUFFIX = ".flat"
+
+
+@cache
+def parser_fingerprint() -> bytes:
+    return fingerprint([Path(__file__).parent / "tree_parser.py"])
+
+
+class ParseCache:
+    def __init__(self, directory: Path = PARSE_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        # cleared by the first write that fails, no point trying every file
+        self._writable = True
+
+    def _entry(self, source: str) -> Path:
+        digest = hashlib.sha256(parser_fingerprint())
+        digest.update(source.encode())
+        return self.directory / (digest.hexdigest() + _ENTRY_SUFFIX)
+
+    def get(self, source: str) -> FlatTree | None:
+        entry = self._entry(source)
+        try:
+            data = entry.read_bytes()
+            flat = FlatTree(*marshal.loads(data))
+        except (OSError, EOFError, ValueError, TypeError):
+            # not there, evicted under our feet, unreadable, or garbage - all just a miss
+            self.misses += 1
+            return None
+        # mtime is the recency eviction goes by
+        try:
+            os.utime(entry)
+        except OSError:
+            # evicted, or read-only. either way its recency doesn't matter much
+            pass
+        self.hits += 1
+        return flat
+
+    def put(self, source: str, flat: FlatTree) -> None:
+        if not self._writable:
+            return
+        if try_write_bytes(self._entry(source), marshal.dumps(tuple(flat))):
+            self._dirty = True
+        else:
+            self._writable = False
+
+    def evict(self) -> None:
+        """drops least recently used entries until the cache fits in `max_bytes`. cheap if nothing was added"""
+        if not self._dirty:
+            return
+        self._dirty = False
+        entries = []
+        total = 0
+        for entry in self.directory.glob("*" + _ENTRY_SUFFIX):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry))
+            total += stat.st_size
+        entries.sort()
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                entry.unlink(missing_ok=True)
+            except OSError as e:
+                default_logger.cache("can't evict {}: {}", entry, e)
+                return
+            total -= size
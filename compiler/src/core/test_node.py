@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Node's child index bookkeeping: `_index` hints against where the children actually are."""
+
+import random
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.node import Node, Position
+
+
+def leaf(name: str) -> Node:
+    return Node(name, Position(0, 0), None)
+
+
+def block(name: str, width: int) -> Node:
+    return Node(name, Position(0, 0), [leaf(f"{name}.{i}") for i in range(width)])
+
+
+class ChildIndexTest(unittest.TestCase):
+    def assert_numbered(self, parent: Node) -> None:
+        """the hints the parent vouches for (its first `_numbered` children) are right"""
+        self.assertLessEqual(parent._numbered, len(parent._children))
+        for i, child in enumerate(parent._children[:parent._numbered]):
+            self.assertEqual(child._index - parent._base, i, child.content)
+
+    def assert_consistent(self, parent: Node) -> None:
+        self.assert_numbered(parent)
+        children = parent.children
+        for child in children:
+            self.assertIs(child.parent, parent)
+            self.assertEqual(parent.index_of_child(child), children.index(child), child.content)
+        # and having looked them all up, every hint is good
+        for child in children:
+            self.assertEqual(child._index - parent._base, children.index(child), child.content)
+
+    def test_edits(self):
+        parent = block("p", 6)
+        self.assert_consistent(parent)
+
+        parent.prepend_child(leaf("front"))
+        parent.append_child([leaf("back.0"), leaf("back.1")])
+        self.assert_numbered(parent)
+        self.assert_consistent(parent)
+
+        middle = parent.children[4]
+        parent.replace_child(middle, leaf("swapped"))
+        self.assertIsNone(middle.parent)
+        self.assert_consistent(parent)
+
+        parent.replace_child(parent.children[2], [leaf("split.0"), leaf("split.1"), leaf("split.2")])
+        parent.replace_child(parent.children[0], None)
+        self.assert_numbered(parent)
+        self.assert_consistent(parent)
+
+        # moving a child to another parent takes it out of this one
+        other = block("o", 2)
+        moved = parent.children[3]
+        other.prepend_child(moved)
+        self.assertIs(moved.parent, other)
+        self.assertNotIn(moved, parent.children)
+        self.assert_consistent(parent)
+        self.assert_consistent(other)
+
+        with self.assertRaises(ValueError):
+            parent.index_of_child(moved)
+
+    def test_random_edits(self):
+        rng = random.Random(67)
+        parent = block("p", 10)
+        spare = block("spare", 40)
+        for step in range(500):
+            children = parent.children
+            op = rng.randrange(5)
+            if op == 0 or not children:
+                parent.prepend_child(leaf(f"pre{step}"))
+            elif op == 1:
+                parent.append_child(leaf(f"app{step}"))
+            elif op == 2:
+                parent.replace_child(rng.choice(children), leaf(f"rep{step}"))
+            elif op == 3:
+                parent.replace_child(rng.choice(children), None)
+            else:
+                # from another parent, into the middle
+                target = rng.choice(children)
+                moved = rng.choice(spare.children) if spare.children else leaf(f"new{step}")
+                parent.replace_child(target, [target, moved])
+            self.assert_numbered(parent)
+            if step % 7 == 0:
+                self.assert_consistent(parent)
+        self.assert_consistent(parent)
+        self.assert_consistent(spare)
+
+    def test_copy_recursive(self):
+        original = block("p", 5)
+        original.prepend_child(block("nested", 3))
+        original.replace_child(original.children[2], None)
+        copy = original.copy_recursive()
+        self.assertEqual(repr(copy), repr(original))
+        # numbered as built, no lookup needed to fix them up
+        for node in (copy, copy.children[0]):
+            self.assertEqual(node._numbered, len(node._children))
+            self.assert_numbered(node)
+            self.assert_consistent(node)
+        self.assertTrue(all(a is not b for a, b in zip(copy.children, original.children)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,84 +1,75 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, field
-from typing import Iterator
-from io import StringIO
-from pathlib import Path
-from utils.strutil import cut, extract_indent
+from typing import NamedTuple
+
 from core.node import Node, Position
-from typing import Generic, List, TypeVar
 from utils.logger import default_logger
 
-T = TypeVar("T")
-
-class TrimStack(Generic[T]):
-    def __init__(self) -> None:
-        self._data: List[T] = []
-
-    def __setitem__(self, index: int, value: T) -> None:
-        if index == len(self._data):
-            self._data.append(value)
-        elif 0 <= index < len(self._data):
-            self._data[index] = value
-        else:
-            raise IndexError("Index out of bounds (can only set existing index or append)")
-
-    def __getitem__(self, index: int) -> T:
-        return self._data[index]
+class FlatTree(NamedTuple):
+    """
+    a parsed file as plain lists in preorder, cheap to pickle across processes.
+    entry 0 is the `67lang:file` root, every later entry's parent comes before it.
+    """
+    contents: list[str]
+    lines: list[int]
+    parents: list[int]
 
-    def trim(self, max_index: int) -> None:
-        if max_index < 0:
-            self._data.clear()
-        else:
-            self._data = self._data[:max_index + 1]
-
-    def __len__(self) -> int:
-        return len(self._data)
-
-    def __repr__(self) -> str:
-        return f"{self.__class__.__name__}({self._data})"
-
-class TreeParser:    
+class TreeParser:
     def parse_tree(self, code: str, compiler=None) -> Node:
+        return self.build_tree(self.parse_flat(code))
+
+    def parse_flat(self, code: str) -> FlatTree:
         # prepend and append newlines for simpler and cleaner handling
         # TODO - although this will fuck over line numbers, so might actually be a bad idea?
         code = f"\n{code}\n"
 
-        @dataclass
-        class ParsingNode:
-            content: str
-            position: Position
-            children: list[ParsingNode] = field(default_factory=list)            
-            def toNode(self):
-                return Node(content=self.content, pos=self.position, children=[child.toNode() for child in self.children])
+        contents = ["67lang:file"]
+        line_nums = [0]
+        parents = [-1]
+        # scope[i] is the index of the innermost open node at indent i, scope[0] being the fake top-level node.
+        # a line may only go one level deeper than the previous one, any further tabs are content
+        scope: list[int] = [0]
 
-        scope: TrimStack[ParsingNode] = TrimStack()
-        root = ParsingNode("67lang:file", Position(0))
-        scope[0] = root
-        line_num = 0
-        
         lines = code.split("\n")
-        default_logger.log("parse", f"processing {len(lines)} lines")
-        
-        for line in lines:
-            line_num += 1 # at the start - assumes above \n{code}\n
-            
-            line, indent = extract_indent(line, max=len(scope) - 1)
+        default_logger.parse("processing {} lines", len(lines))
+
+        # line numbers start at 1 for the blank line prepended above
+        for line_num, line in enumerate(lines, 1):
+            content = line.lstrip("\t")
+            indent = len(line) - len(content)
+            max_indent = len(scope) - 1
+            if indent > max_indent:
+                content = line[max_indent:]
+                indent = max_indent
+
+            if not content or content.isspace():
+                # skip empty/indentation-only lines
+                continue
 
             # simplifies code. all the top-level lines are indent-1, belonging to a fake top-level Node
             # which is at indent-0
             indent += 1
 
-            if line.isspace() or len(line) <= 0:
-                # skip empty/indentation-only lines
-                continue
+            default_logger.parse("line {}: indent={}, content='{}'", line_num, indent, content)
+            parents.append(scope[indent - 1])
+            del scope[indent:]
+            scope.append(len(contents))
+            contents.append(content)
+            line_nums.append(line_num)
+
+        return FlatTree(contents, line_nums, parents)
+
+    def build_tree(self, flat: FlatTree) -> Node:
+        nodes: list[Node] = []
+        for content, line_num, parent_index in zip(flat.contents, flat.lines, flat.parents):
+            node = Node(content, Position(line_num), None)
+            if parent_index >= 0:
+                parent = nodes[parent_index]
+                parent._children.append(node)
+                node.parent = parent
+            nodes.append(node)
+        return nodes[0]
 
-            default_logger.log("parse", f"line {line_num}: indent={indent}, content='{line}'")
-            node = ParsingNode(line, Position(line_num))
-            scope[indent - 1].children.append(node)
-            scope[indent] = node
-            scope.trim(indent)
-        
-        result = root.toNode()
-        return result
-        
\ No newline at end of file
+def parse_flat(code: str) -> FlatTree:
+    """module level so process pools can pickle it"""
+    return TreeParser().parse_flat(code)
@@ -1,10 +1,16 @@
-from dataclasses import replace
 from pipeline.steps import MacroProcessingStep
 from core.macro_registry import MacroContext, MacroRegistry
-from core.node import Node, Macro
+from core.node import Node
 from utils.logger import default_logger
 from utils.error_types import ErrorType
 
+# associate code blocks with relevant headers
+CODE_BLOCK_HEADERS = {
+    "while": "do", 
+    "for": "do",
+    "fn": "do"
+}
+
 class CodeBlockAssociator:
     def __init__(self):
         # This runs on every node type to check for code block associations
@@ -12,15 +18,8 @@ class CodeBlockAssociator:
         
     def process_code_blocks(self, node: Node, compiler):
         """Process code block associations for a node"""
-        # associate code blocks with relevant headers
-        CODE_BLOCK_HEADERS = {
-            "while": "do", 
-            "for": "do",
-            "fn": "do"
-        }
-        
         children = node.children
-        default_logger.codegen(f"checking node '{node.content}' for code block associations")
+        default_logger.codegen("checking node '{}' for code block associations", node.content)
         
         for i in range(len(children)):
             current = children[i]
@@ -29,13 +28,13 @@ class CodeBlockAssociator:
             if not current or not next_child:
                 continue
 
-            current_macro = str(compiler.get_metadata(current, Macro))
+            current_macro = current.macro
             if current_macro in CODE_BLOCK_HEADERS:
                 expected_next = CODE_BLOCK_HEADERS[current_macro]
-                next_macro = str(compiler.get_metadata(next_child, Macro))
-                default_logger.codegen(f"found '{current_macro}' expecting '{expected_next}', got '{next_macro}'")
+                next_macro = next_child.macro
+                default_logger.codegen("found '{}' expecting '{}', got '{}'", current_macro, expected_next, next_macro)
                 if next_macro == expected_next:
-                    default_logger.codegen(f"linking '{next_macro}' to '{current_macro}'")
+                    default_logger.codegen("linking '{}' to '{}'", next_macro, current_macro)
                     node.replace_child(next_child, None)
                     current.append_child(next_child)
                 else:
@@ -53,27 +52,26 @@ class CodeBlockLinkingStep(MacroProcessingStep):
         super().__init__()
         self.associator = CodeBlockAssociator()
         self.macros = macros
+        self.dispatch = macros.freeze()
+
+    def wants(self, macro: str) -> bool:
+        # outside of its handlers, all linking does is pair up a header child with the `do` after it
+        return macro in self.dispatch or macro in CODE_BLOCK_HEADERS
         
     def process_node(self, ctx: MacroContext) -> None:
-        """Process code block associations for a node"""
-        default_logger.codegen(f"processing code block linking for: {ctx.node.content}")
-        
-        # Skip comment macros entirely using the shared registry
-        from core.node import Macro
-        macro = str(ctx.compiler.get_metadata(ctx.node, Macro))
-        if macro in self.macros.all():
-            self.macros.get(macro)(ctx)
-            return
-        
-        # Process children first
-        with default_logger.indent("codegen", f"processing children of {ctx.node.content}"):
-            for i, child in enumerate(ctx.node.children):
-                with default_logger.indent("codegen", f"child {i}: {child.content}"):
-                    with ctx.compiler.safely:
-                        child_ctx = replace(ctx, node=child)
-                        self.process_node(child_ctx)
-                
-        # Process current node
-        with default_logger.indent("codegen", f"linking code blocks for {ctx.node.content}"):
+        """Process code block associations for a node and everything under it"""
+        self.walk(ctx)
+
+    def enter(self, ctx: MacroContext) -> bool:
+        default_logger.codegen("processing code block linking for: {}", ctx.node.content)
+        self.open_log_indent("codegen", "linking code blocks under {}", ctx.node.content, node=ctx.node)
+        # a node with a handler (comments, so far) is left alone, handler and all
+        return super().enter(ctx)
+
+    def exit(self, ctx: MacroContext) -> None:
+        # children first, then the node's own child list, so a `do` is done with by the time
+        # it gets moved under its header
+        if ctx.node.macro not in self.dispatch:
             with ctx.compiler.safely:
-                self.associator.process_code_blocks(ctx.node, ctx.compiler)
\ No newline at end of file
+                self.associator.process_code_blocks(ctx.node, ctx.compiler)
+        self.close_log_indent()
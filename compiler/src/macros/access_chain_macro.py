@@ -2,14 +2,14 @@
 
 from dataclasses import replace
 from core.macro_registry import MacroContext, Macro_preprocess_provider
-from core.node import Args, Position
+from core.node import Position
 from pipeline.steps import PreprocessingStep
 from utils.strutil import cut
 
 
 class Access_macro_provider(Macro_preprocess_provider):
     def preprocess(self, ctx: MacroContext):
-        args = ctx.compiler.get_metadata(ctx.node, Args)
+        args = ctx.node.args
         parent = ctx.node.parent
         
         assert parent != None
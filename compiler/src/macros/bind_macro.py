@@ -47,10 +47,10 @@ class Bind_macro_provider(Macro_emission_provider, Macro_preprocess_provider, Ma
         
         # If not found, check builtin calls
         if actual_fn_name is None:
-            from pipeline.builtin_calls import builtin_calls
-            if desired_fn_name in builtin_calls:
-                builtin_call = builtin_calls[desired_fn_name]
-                if isinstance(builtin_call, list) and len(builtin_call) > 0:
+            from pipeline.builtin_calls import builtin_catalog
+            if desired_fn_name in builtin_catalog:
+                builtin_call = builtin_catalog[desired_fn_name]
+                if len(builtin_call) > 0:
                     builtin_call = builtin_call[0]  # Take the first overload
                 
                 if hasattr(builtin_call, 'fn') and hasattr(builtin_call, 'receiver'):
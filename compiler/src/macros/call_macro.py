@@ -1,56 +1,29 @@
-from dataclasses import asdict, replace
+from dataclasses import asdict, dataclass, replace
+from typing import Any
 from pipeline.steps import MacroProcessingStep, seek_child_macro
-from pipeline.builtin_calls import builtin_calls, DirectCall, LocalAccessCall, js_field_access
+from pipeline.builtin_calls import builtin_catalog, DirectCall, LocalAccessCall, js_field_access
 from pipeline.js_conversion import to_valid_js_ident
 from pipeline.local_lookup import walk_upwards_for_local_definition
 from utils.strutil import cut
 from core.macro_registry import MacroContext, Macro_emission_provider, Macro_typecheck_provider, MacroRegistry
 from utils.strutil import IndentedStringIO, Joiner
-from core.node import Args, Macro, Params, Inject_code_start, SaneIdentifier, ResolvedConvention
+from core.node import Params, Inject_code_start, SaneIdentifier, ResolvedConvention
 from utils.common_utils import collect_child_expressions, get_single_arg, get_two_args
 from utils.error_types import ErrorType
 from utils.logger import default_logger
-from compiler_types.type_hierarchy import type_hierarchy, union_types
-from compiler_types.proper_types import TypeVariable, Type, TypeSubstitution
+from compiler_types.proper_types import ComplexType, TypeVariable, Type, TypeSubstitution, type_lattice
 from core.exceptions import graceful_typecheck
 
-class TypeHierarchyChecker:
-    def __init__(self, hierarchy, unions):
-        self.hierarchy = hierarchy
-        self.unions = unions
-
-    def is_subtype(self, child, parent):
-        # Handle Type objects from new type system
-        from compiler_types.proper_types import Type
-        if isinstance(child, Type) and isinstance(parent, Type):
-            return child.is_assignable_to(parent)
-        
-        # Convert Type objects to strings for legacy compatibility
-        if isinstance(child, Type):
-            child = str(child)
-        if isinstance(parent, Type):
-            parent = str(parent)
-            
-        if child == parent:
-            return True
-
-        if parent in self.unions:
-            for member in self.unions[parent]:
-                if self.is_subtype(child, member):
-                    return True
-
-        if child not in self.hierarchy:
-            return False
-        
-        # Check all parent types (hierarchy[child] is now a list)
-        parent_types = self.hierarchy[child]
-        for parent_type in parent_types:
-            if self.is_subtype(parent_type, parent):
-                return True
-        
-        return False
-
-type_checker = TypeHierarchyChecker(type_hierarchy, union_types)
+def is_subtype(child, parent) -> bool:
+    # Handle Type objects from new type system
+    if isinstance(child, Type) and isinstance(parent, Type):
+        return child.is_assignable_to(parent)
+    # Convert Type objects to strings for legacy compatibility
+    if isinstance(child, Type):
+        child = str(child)
+    if isinstance(parent, Type):
+        parent = str(parent)
+    return type_lattice().is_subtype(child, parent)
 
 
 def unify_types(actual_types: list, signature_types: list) -> tuple[bool, dict[str, Type]]:
@@ -72,8 +45,6 @@ def unify_types(actual_types: list, signature_types: list) -> tuple[bool, dict[s
 
 def unify_single_type(actual: Type, signature: Type, substitutions: dict[str, Type]) -> bool:
     """Unify a single actual type with a signature type, updating substitutions."""
-    from compiler_types.proper_types import ComplexType
-    
     # Handle wildcards
     if isinstance(signature, str) and signature == "*":
         return True
@@ -122,7 +93,7 @@ def unify_single_type(actual: Type, signature: Type, substitutions: dict[str, Ty
     
     # Legacy string-based type checking
     if isinstance(actual, str) and isinstance(signature, str):
-        return type_checker.is_subtype(actual, signature)
+        return is_subtype(actual, signature)
     
     return False
 
@@ -135,44 +106,123 @@ def types_equivalent(type1: Type, type2: Type) -> bool:
     return str(type1) == str(type2)
 
 
+def fits_demand(actual, demanded) -> bool:
+    """one argument against one demand, the way _matches_signature does it when unification fails"""
+    # "*" matches anything
+    if demanded == "*" or actual == "*":
+        return True
+    if isinstance(actual, Type) and isinstance(demanded, str):
+        return actual.is_assignable_to(demanded)
+    return is_subtype(actual, demanded)
+
+
+def fits_receiver(actual, demanded) -> bool:
+    """
+    whether an overload demanding `demanded` first could still match a call whose first argument
+    is `actual` - exactly what _matches_signature makes of position 0, see OverloadIndex
+    """
+    return unify_single_type(actual, demanded, {}) or fits_demand(actual, demanded)
+
+
+def specificity_score(conv, actual_arg_types: list) -> tuple[int, int]:
+    if not hasattr(conv, 'demands') or not conv.demands:
+        return (0, 0)  # No demands, least specific
+
+    # Only count specificity for positions where the actual argument is NOT "*"
+    # If the caller provides "*", it means "we don't know the type", so we shouldn't
+    # use that position to prefer one overload over another
+    specific_count = 0
+    for actual, demanded in zip(actual_arg_types, conv.demands):
+        if actual != "*" and demanded != "*":
+            specific_count += 1
+
+    # Tie-breaker: prefer shorter signatures when specificity is equal
+    return (specific_count, -len(conv.demands))
+
+
+def most_specific(matching: list[tuple[Any, dict]], actual_arg_types: list, memo: dict | None = None) -> tuple[ResolvedConvention | None, list]:
+    """
+    `matching` is (convention, substitutions) pairs from _matches_signature. the convention to go
+    with and no ties, or None and the equally specific conventions tying for it.
+    `memo` goes to TypeSubstitution
+    """
+    if len(matching) <= 1:
+        return (resolved_convention(*matching[0], memo) if matching else None), []
+    # Choose the most specific match based on demand specificity
+    scores = [specificity_score(conv, actual_arg_types) for conv, _ in matching]
+    best = max(scores)
+    equally_specific = [match for match, score in zip(matching, scores) if score == best]
+    if len(equally_specific) > 1:
+        return None, [conv for conv, _ in equally_specific]
+    return resolved_convention(*equally_specific[0], memo), []
+
+
+def resolved_convention(convention, substitutions: dict[str, Type], memo: dict | None = None) -> ResolvedConvention:
+    if not substitutions:
+        return ResolvedConvention(convention, {}, convention.demands, convention.returns or "*")
+    subst = TypeSubstitution(substitutions, memo)
+    unified_demands = [subst.apply(demand) if isinstance(demand, Type) else demand for demand in convention.demands]
+    returns = subst.apply(convention.returns) if isinstance(convention.returns, Type) else convention.returns
+    return ResolvedConvention(convention, substitutions, unified_demands, returns or "*")
+
+
+@dataclass(frozen=True)
+class BuiltinResolution:
+    """how the builtin overloads of a name resolve for some argument types, see Macrocosm.overload_cache"""
+    # (convention, substitutions) pairs
+    matching: list[tuple[Any, dict]]
+    chosen: ResolvedConvention | None
+    ambiguous: list
+
+
+def overload_to_dict(o):
+    d = asdict(o)
+    d["convention"] = type(o).__name__
+    return d
+
+
 class Call_macro_provider(Macro_emission_provider, Macro_typecheck_provider):
-    def _matches_signature(self, actual_types: list, demanded_types: list) -> bool:
-        default_logger.typecheck(f"_matches_signature: actual={actual_types}, demanded={demanded_types}")
+    def _matches_signature(self, actual_types: list, demanded_types: list) -> dict[str, Type] | None:
+        """
+        None if the call doesn't fit, otherwise the type variable substitutions unifying it took -
+        empty if there was nothing to substitute, or it only fit the legacy way
+        """
+        default_logger.typecheck("_matches_signature: actual={}, demanded={}", actual_types, demanded_types)
         if demanded_types is None:
-            return True # No specific demands, so it matches
+            return {} # No specific demands, so it matches
         
         # Try unification first (for polymorphic signatures)
         success, substitutions = unify_types(actual_types, demanded_types)
         if success:
-            default_logger.typecheck(f"_matches_signature: unified with substitutions {substitutions}")
-            return True
+            default_logger.typecheck("_matches_signature: unified with substitutions {}", substitutions)
+            return substitutions
         
         # Fall back to legacy type checking
         if len(actual_types) != len(demanded_types):
-            return False
+            return None
         
         for actual, demanded in zip(actual_types, demanded_types):
-            # "*" matches anything
-            if demanded == "*" or actual == "*":
-                continue
-            
-            from compiler_types.proper_types import Type
-            if isinstance(actual, Type) and isinstance(demanded, str):
-                if not actual.is_assignable_to(demanded):
-                    default_logger.typecheck(f"_matches_signature: {actual} is not assignable to {demanded}")
-                    return False
-            elif not type_checker.is_subtype(actual, demanded):
-                default_logger.typecheck(f"_matches_signature: {actual} is not a subtype of {demanded}")
-                return False
+            if not fits_demand(actual, demanded):
+                default_logger.typecheck("_matches_signature: {} does not fit {}", actual, demanded)
+                return None
         
-        default_logger.typecheck(f"_matches_signature: match! {actual_types} {demanded_types}")
-        return True
+        default_logger.typecheck("_matches_signature: match! {} {}", actual_types, demanded_types)
+        return {}
+
+    def _matching(self, conventions: list, actual_arg_types: list) -> list[tuple[Any, dict]]:
+        """(convention, substitutions) for each of `conventions` the call fits"""
+        matching = []
+        for conv in conventions:
+            substitutions = self._matches_signature(actual_arg_types, conv.demands)
+            if substitutions is not None:
+                matching.append((conv, substitutions))
+        return matching
 
     def _resolve_local_definition(self, ctx: MacroContext, fn: str) -> list:
         res = walk_upwards_for_local_definition(ctx, fn)
         if res:
             from pipeline.builtin_calls import LocalAccessCall
-            macro = ctx.compiler.get_metadata(res.node, Macro)
+            macro = res.node.macro
             if macro in {"local", "67lang:assume_local_exists"}:
                 name = get_single_arg(replace(ctx, node=res.node))
                 fn = ctx.compiler.maybe_metadata(res.node, SaneIdentifier) or name
@@ -184,14 +234,27 @@ class Call_macro_provider(Macro_emission_provider, Macro_typecheck_provider):
                 ]
         return []
 
-    def _resolve_builtin_call(self, ctx: MacroContext, fn: str) -> list:
-        if fn in builtin_calls:
-            overloads = builtin_calls[fn]
-            if isinstance(overloads, list):
-                return overloads
-            else:
-                return [overloads]
-        return []
+    def _resolve_builtin_call(self, ctx: MacroContext, fn: str, actual_arg_types: list) -> BuiltinResolution:
+        """
+        the builtin overloads of `fn` that match, from the ones the overload index lets through.
+        the same name called with the same types resolves the same way all over a program, so it's
+        done once per compilation
+        """
+        try:
+            key = (fn, tuple(actual_arg_types))
+            resolution = ctx.compiler.overload_cache.get(key)
+        except TypeError:
+            # some argument type that doesn't hash, no caching that one
+            key = resolution = None
+        if resolution is None:
+            receiver = actual_arg_types[0]
+            candidates = builtin_catalog.index(fn).candidates(
+                len(actual_arg_types), lambda demanded: fits_receiver(receiver, demanded))
+            matching = self._matching(candidates, actual_arg_types)
+            resolution = BuiltinResolution(matching, *most_specific(matching, actual_arg_types, ctx.compiler.substitution_cache))
+            if key is not None:
+                ctx.compiler.overload_cache[key] = resolution
+        return resolution
 
     def _resolve_dynamic_convention(self, ctx: MacroContext, fn: str) -> list:
         if fn in ctx.compiler._dynamic_conventions:
@@ -202,92 +265,55 @@ class Call_macro_provider(Macro_emission_provider, Macro_typecheck_provider):
                 return [overloads]
         return []
 
-    def resolve_convention(self, ctx: MacroContext, actual_arg_types: list = None):  # TODO: Proper Type objects
-        args_str = ctx.compiler.get_metadata(ctx.node, Args)
+    def resolve_convention(self, ctx: MacroContext, actual_arg_types: list = None) -> ResolvedConvention:  # TODO: Proper Type objects
+        args_str = ctx.node.args
         args = args_str.split(" ")
         ctx.compiler.assert_(len(args) == 1, ctx.node, "single argument, the function to call")
 
         fn = args[0]
 
-        all_possible_conventions = []
-        all_possible_conventions.extend(self._resolve_local_definition(ctx, fn))
-        all_possible_conventions.extend(self._resolve_builtin_call(ctx, fn))
-        all_possible_conventions.extend(self._resolve_dynamic_convention(ctx, fn))
+        # candidates come in this order: locals, builtins, dynamic conventions
+        local_conventions = self._resolve_local_definition(ctx, fn)
+        dynamic_conventions = self._resolve_dynamic_convention(ctx, fn)
 
-        default_logger.log("testing_123", f"all_possible_conventions: {repr(all_possible_conventions)}")
+        default_logger.log("testing_123", lambda: f"all_possible_conventions: {local_conventions + builtin_catalog.get(fn, []) + dynamic_conventions!r}")
 
-        convention = None
+        resolved = None
         if actual_arg_types:
-            matching_conventions = []
-            for conv in all_possible_conventions:
-                if self._matches_signature(actual_arg_types, conv.demands):
-                    matching_conventions.append(conv)
-            
-            if len(matching_conventions) > 1:
-                # Choose the most specific match based on demand specificity
-                def specificity_score(conv):
-                    if not hasattr(conv, 'demands') or not conv.demands:
-                        return (0, 0)  # No demands, least specific
-                    
-                    # Only count specificity for positions where the actual argument is NOT "*"
-                    # If the caller provides "*", it means "we don't know the type", so we shouldn't
-                    # use that position to prefer one overload over another
-                    specific_count = 0
-                    for i, (actual, demanded) in enumerate(zip(actual_arg_types, conv.demands)):
-                        if actual != "*" and demanded != "*":
-                            specific_count += 1
-                    
-                    # Tie-breaker: prefer shorter signatures when specificity is equal
-                    return (specific_count, -len(conv.demands))
-                
-                most_specific = max(matching_conventions, key=specificity_score)
-                max_score = specificity_score(most_specific)
-                
-                # Check if there are multiple conventions with the same highest specificity
-                equally_specific = [conv for conv in matching_conventions if specificity_score(conv) == max_score]
-                
-                if len(equally_specific) > 1:
-                    def overload_to_dict(o):
-                        d = asdict(o)
-                        d["convention"] = type(o).__name__
-                        return d
-                    matching_overloads = [overload_to_dict(o) for o in equally_specific]
-                    ctx.compiler.assert_(False, ctx.node, f"multiple equally specific overloads match for {fn} with arguments {actual_arg_types}", ErrorType.AMBIGUOUS_OVERLOAD, extra_fields={"matching_overloads": matching_overloads})
-                else:
-                    convention = most_specific
-            elif len(matching_conventions) == 1:
-                convention = matching_conventions[0]
+            builtin = self._resolve_builtin_call(ctx, fn, actual_arg_types)
+            matching_locals = self._matching(local_conventions, actual_arg_types)
+            matching_dynamic = self._matching(dynamic_conventions, actual_arg_types)
+            if matching_locals or matching_dynamic:
+                matching_conventions = matching_locals + builtin.matching + matching_dynamic
+                resolved, equally_specific = most_specific(matching_conventions, actual_arg_types, ctx.compiler.substitution_cache)
+            else:
+                resolved, equally_specific = builtin.chosen, builtin.ambiguous
+
+            if equally_specific:
+                matching_overloads = [overload_to_dict(o) for o in equally_specific]
+                ctx.compiler.assert_(False, ctx.node, f"multiple equally specific overloads match for {fn} with arguments {actual_arg_types}", ErrorType.AMBIGUOUS_OVERLOAD, extra_fields={"matching_overloads": matching_overloads})
         else:
             # If no type information, filter by argument count and pick the first one
-            if all_possible_conventions:
-                # Filter conventions that match the argument count
-                arg_count = len(ctx.node.children)
-                count_matching_conventions = []
-                for conv in all_possible_conventions:
-                    if conv.demands is None or len(conv.demands) == arg_count:
-                        count_matching_conventions.append(conv)
-                
-                if count_matching_conventions:
-                    convention = count_matching_conventions[0]
-                else:
-                    # No conventions match the argument count
-                    convention = None
-
-        if not convention:
-            def overload_to_dict(o):
-                d = asdict(o)
-                d["convention"] = type(o).__name__
-                return d
+            arg_count = len(ctx.node.child_view)
+            count_matching_conventions = [conv for conv in local_conventions if conv.demands is None or len(conv.demands) == arg_count]
+            count_matching_conventions += builtin_catalog.index(fn).candidates(arg_count)
+            count_matching_conventions += [conv for conv in dynamic_conventions if conv.demands is None or len(conv.demands) == arg_count]
+            if count_matching_conventions:
+                # no types, nothing to unify
+                resolved = resolved_convention(count_matching_conventions[0], {})
+
+        if not resolved:
+            all_possible_conventions = local_conventions + builtin_catalog.get(fn, []) + dynamic_conventions
             available_overloads = [overload_to_dict(o) for o in all_possible_conventions]
             ctx.compiler.assert_(False, ctx.node, f"could not find a matching overload for {fn} with arguments {actual_arg_types}", ErrorType.NO_MATCHING_OVERLOAD, extra_fields={"visible_overloads": available_overloads})
 
-        return convention
+        return resolved
 
     @graceful_typecheck
     def typecheck(self, ctx: MacroContext):
         # First, determine the actual parameter types - now properly handling Type objects
         args = []  # TODO: Fully convert to Type objects throughout
-        for child in ctx.node.children:
+        for child in ctx.node.child_view:
             # Find the typecheck step to handle type checking
             typecheck_step = ctx.current_step
             # Import here to avoid circular imports
@@ -299,37 +325,30 @@ class Call_macro_provider(Macro_emission_provider, Macro_typecheck_provider):
 
 
         # Now resolve the convention with actual parameter types
-        convention = self.resolve_convention(ctx, args)
+        resolved = self.resolve_convention(ctx, args)
         
         # Store the resolved convention in metadata for later use during compilation
-        ctx.compiler.set_metadata(ctx.node, ResolvedConvention, ResolvedConvention(convention=convention))
+        ctx.compiler.set_metadata(ctx.node, ResolvedConvention, resolved)
 
         # TODO: add assertion for argument count
+        convention = resolved.convention
         if convention.demands:
-            # Try unification to handle polymorphic types
-            from compiler_types.proper_types import Type
-            success, substitutions = unify_types(args, convention.demands)
-            if success and substitutions:
-                # Apply substitutions to validate the unified types
-                subst = TypeSubstitution(substitutions)
-                unified_demands = [subst.apply(demand) if isinstance(demand, Type) else demand 
-                                 for demand in convention.demands]
-                
+            if resolved.substitutions:
+                # validate the demands with the substitutions resolving the call took applied
                 i = 0
-                for received, unified_demand in zip(args, unified_demands):
+                for received, unified_demand in zip(args, resolved.unified_demands):
                     i += 1
                     if "*" in {unified_demand, received}:
                         continue
                     
-                    default_logger.typecheck(f"{ctx.node.content} demanded {unified_demand} (unified from {convention.demands[i-1]}) and was given {received}")
+                    default_logger.typecheck("{} demanded {} (unified from {}) and was given {}", ctx.node.content, unified_demand, convention.demands[i-1], received)
                     
-                    from compiler_types.proper_types import Type
                     if isinstance(received, Type) and isinstance(unified_demand, str):
                         type_compatible = received.is_assignable_to(unified_demand)
                     elif isinstance(received, Type) and isinstance(unified_demand, Type):
                         type_compatible = received.is_assignable_to(unified_demand)
                     else:
-                        type_compatible = type_checker.is_subtype(received, unified_demand)
+                        type_compatible = is_subtype(received, unified_demand)
                     
                     ctx.compiler.assert_(type_compatible, ctx.node, f"argument {i} demands {unified_demand} and is given {received}", ErrorType.ARGUMENT_TYPE_MISMATCH)
             else:
@@ -339,40 +358,29 @@ class Call_macro_provider(Macro_emission_provider, Macro_typecheck_provider):
                     i += 1
                     if "*" in {str(demanded), str(received)}:
                         continue
-                    default_logger.typecheck(f"{ctx.node.content} demanded {demanded} and was given {received}")
+                    default_logger.typecheck("{} demanded {} and was given {}", ctx.node.content, demanded, received)
                     
-                    from compiler_types.proper_types import Type
                     if isinstance(received, Type) and isinstance(demanded, str):
                         type_compatible = received.is_assignable_to(demanded)
                     else:
-                        type_compatible = type_checker.is_subtype(received, demanded)
+                        type_compatible = is_subtype(received, demanded)
                     
                     ctx.compiler.assert_(type_compatible, ctx.node, f"argument {i} demands {demanded} and is given {received}", ErrorType.ARGUMENT_TYPE_MISMATCH)
 
-        # Apply substitutions to return type if we have them
-        if convention.demands:
-            from compiler_types.proper_types import Type
-            success, substitutions = unify_types(args, convention.demands)
-            if success and substitutions:
-                subst = TypeSubstitution(substitutions)
-                if isinstance(convention.returns, Type):
-                    return subst.apply(convention.returns)
-        
-        return convention.returns or "*"
+        return resolved.returns
 
     def emission(self, ctx: MacroContext):
         try:
-            args_str = ctx.compiler.get_metadata(ctx.node, Args)
+            args_str = ctx.node.args
             args1 = args_str.split(" ")
             ident = ctx.compiler.get_new_ident("_".join(args1))
             
             # Try to get the resolved convention from metadata first
-            try:
-                resolved_conv = ctx.compiler.get_metadata(ctx.node, ResolvedConvention)
-                convention = resolved_conv.convention
-            except KeyError:
+            resolved = ctx.compiler.maybe_metadata(ctx.node, ResolvedConvention)
+            if resolved is None:
                 # Fallback to the old method if metadata not available
-                convention = self.resolve_convention(ctx)
+                resolved = self.resolve_convention(ctx)
+            convention = resolved.convention
             
             args = collect_child_expressions(ctx)
 
@@ -382,8 +390,8 @@ class Call_macro_provider(Macro_emission_provider, Macro_typecheck_provider):
             ctx.expression_out.write(ident)
         except Exception as e:
             # If the entire call emission fails, produce invalid JavaScript to prevent cascading crashes
-            default_logger.debug(f"Call emission failed for {ctx.node.content}: {e}, producing error marker")
-            args_str = ctx.compiler.get_metadata(ctx.node, Args)
+            default_logger.debug("Call emission failed for {}: {}, producing error marker", ctx.node.content, e)
+            args_str = ctx.node.args
             args1 = args_str.split(" ")
             ident = ctx.compiler.get_new_ident("_".join(args1))
             ctx.statement_out.write(f"const {ident} = ??????COMPILE_ERROR;\n")
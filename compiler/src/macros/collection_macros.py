@@ -17,8 +17,7 @@ class List_macro_provider(Macro_emission_provider, Macro_typecheck_provider):
                 type_params.append(result)
             else:
                 # This is a value operation - check if it's explicit or implicit
-                from core.node import Macro
-                macro = ctx.compiler.get_metadata(child, Macro)
+                macro = child.macro
                 if macro in ["append", "prepend", "insert_after_index"]:
                     # Explicit operation - check all its children
                     for grandchild in child.children:
@@ -71,11 +70,10 @@ class List_macro_provider(Macro_emission_provider, Macro_typecheck_provider):
             return
         
         # Collect all operations in order
-        from core.node import Macro
         operations = []
         
         for child in ctx.node.children:
-            macro = ctx.compiler.get_metadata(child, Macro)
+            macro = child.macro
             if macro == "type":
                 # Skip type declarations during emission
                 continue
@@ -143,8 +141,7 @@ class Dict_macro_provider(Macro_emission_provider, Macro_typecheck_provider):
                 type_params.append(result)
             else:
                 # This should be an entry operation
-                from core.node import Macro
-                macro = ctx.compiler.get_metadata(child, Macro)
+                macro = child.macro
                 if macro == "entry":
                     # Entry has exactly 2 children: key and value
                     if len(child.children) == 2:
@@ -220,11 +217,10 @@ class Dict_macro_provider(Macro_emission_provider, Macro_typecheck_provider):
             return
         
         # Process only entry macros, skip type declarations  
-        from core.node import Macro
         entry_pairs = []
         
         for child in ctx.node.children:
-            macro = ctx.compiler.get_metadata(child, Macro)
+            macro = child.macro
             if macro == "type":
                 # Skip type declarations during emission
                 continue
@@ -1,7 +1,6 @@
 """Exists macro for checking file/directory existence."""
 
 from core.macro_registry import MacroContext, Macro_emission_provider
-from core.node import Args
 from utils.strutil import cut
 
 
@@ -14,7 +13,7 @@ class Exists_macro_provider(Macro_emission_provider):
         for child in ctx.node.children:
             macro, _ = cut(child.content, " ")
             if macro == "inside":
-                args_str = ctx.compiler.get_metadata(child, Args)
+                args_str = child.args
                 ctx.compiler.assert_(args_str.strip() == "", child, "inside must have no arguments")
                 ctx.compiler.assert_(len(child.children) == 1, child, "inside must have one child")
                 target = child.children[0]
@@ -69,8 +69,7 @@ class Fn_macro_provider(Macro_emission_provider, Macro_preprocess_provider):
 
         # Only process non-param children (param children are handled above)
         for child in ctx.node.children:
-            from core.node import Macro
-            child_macro = ctx.compiler.get_metadata(child, Macro)
+            child_macro = child.macro
             if child_macro != "param":
                 ctx.current_step.process_node(replace(ctx, node=child))
 
@@ -8,8 +8,8 @@ class For_macro_provider(Macro_emission_provider, Macro_preprocess_provider):
     def preprocess(self, ctx: MacroContext):
         # TODO. yes i really do hate this hack. really what we should just do is unroll `for` into the
         #  manual while true early into the processing
-        from core.node import Args, Node
-        args = ctx.compiler.get_metadata(ctx.node, Args)
+        from core.node import Node
+        args = ctx.node.args
         args = args.split(" ")
         name = args[0] # TODO - this won't support any identifier, it probably should!
 
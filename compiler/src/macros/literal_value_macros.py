@@ -1,7 +1,6 @@
 from typing import Literal, Type, Union
 from utils.error_types import ErrorType
 from core.macro_registry import Macro_code_linking_provider, Macro_emission_provider, Macro_preprocess_provider, Macro_typecheck_provider, MacroContext
-from core.node import Args
 
 class Number_macro_provider(
         Macro_preprocess_provider,
@@ -12,7 +11,7 @@ class Number_macro_provider(
         self.number_type = number_type
 
     def preprocess(self, ctx: MacroContext):
-        args = ctx.compiler.get_metadata(ctx.node, Args)
+        args = ctx.node.args
         try:
             self.number_type(args)
         except ValueError:
@@ -31,7 +30,7 @@ class Number_macro_provider(
         return INT if self.number_type is int else FLOAT
 
     def emission(self, ctx: MacroContext):
-        args = ctx.compiler.get_metadata(ctx.node, Args)
+        args = ctx.node.args
         ctx.expression_out.write(str(args))
 
 class String_macro_provider(
@@ -55,7 +54,7 @@ class String_macro_provider(
         pass
 
     def emission(self, ctx: MacroContext):
-        s: str = ctx.compiler.get_metadata(ctx.node, Args)
+        s: str = ctx.node.args
         if len(s) == 0:
             # multiline string: collect content from entire subtree, reconstructing indentation
             lines = []
@@ -15,9 +15,9 @@ from core.exceptions import graceful_typecheck
 class Local_macro_provider(Macro_emission_provider, Macro_typecheck_provider, Macro_preprocess_provider):
     def preprocess(self, ctx: MacroContext):
         # Process children first
-        with default_logger.indent("macro", f"preprocessing children of {ctx.node.content}"):
+        with default_logger.indent("macro", "preprocessing children of {}", ctx.node.content):
             for i, child in enumerate(ctx.node.children):
-                with default_logger.indent("macro", f"child {i}: {child.content}"):
+                with default_logger.indent("macro", "child {}: {}", i, child.content):
                     with ctx.compiler.safely:
                         child_ctx = replace(ctx, node=child)
                         ctx.current_step.process_node(child_ctx)
@@ -30,7 +30,7 @@ class Local_macro_provider(Macro_emission_provider, Macro_typecheck_provider, Ma
         desired_name = get_single_arg(ctx)
         name = ctx.compiler.maybe_metadata(ctx.node, SaneIdentifier) or desired_name
         
-        args = collect_child_expressions(ctx) if len(ctx.node.children) > 0 else []
+        args = collect_child_expressions(ctx) if len(ctx.node.child_view) > 0 else []
         
         
         ctx.statement_out.write(f"let {name}")
@@ -48,7 +48,7 @@ class Local_macro_provider(Macro_emission_provider, Macro_typecheck_provider, Ma
         typecheck_step = ctx.current_step
         assert isinstance(typecheck_step, TypeCheckingStep)
         
-        for child in ctx.node.children:
+        for child in ctx.node.child_view:
             child_result = typecheck_step.process_node(replace(ctx, node=child))
             
             if isinstance(child_result, TypeParameter):
@@ -59,7 +59,7 @@ class Local_macro_provider(Macro_emission_provider, Macro_typecheck_provider, Ma
                 received_type = child_result
             elif child_result is not None:
                 # Legacy string type - need to handle during transition
-                default_logger.typecheck(f"Warning: got legacy string type {child_result}")
+                default_logger.typecheck("Warning: got legacy string type {}", child_result)
                 # For now, just use the received value for compatibility
                 received_type = child_result
 
@@ -71,7 +71,7 @@ class Local_macro_provider(Macro_emission_provider, Macro_typecheck_provider, Ma
         if demanded_type is None:
             demanded_type = received_type
         
-        default_logger.typecheck(f"{ctx.node.content} demanded {demanded_type} and was given {received_type}")
+        default_logger.typecheck("{} demanded {} and was given {}", ctx.node.content, demanded_type, received_type)
         
         # Store the local variable type information for upward walking
         from core.node import FieldDemandType
@@ -7,8 +7,7 @@ SCOPE_MACRO = ["else", "67lang:file"]
 
 class Scope_macro_provider(Macro_emission_provider, Macro_typecheck_provider):
     def emission(self, ctx: MacroContext):
-        from core.node import Macro
-        macro = ctx.compiler.get_metadata(ctx.node, Macro)
+        macro = ctx.node.macro
         if macro in ["else"]:
             ctx.statement_out.write(f"{macro} ")
 
@@ -22,7 +21,7 @@ class Scope_macro_provider(Macro_emission_provider, Macro_typecheck_provider):
                 if inject:
                     for code in inject.code:
                         ctx.statement_out.write(code)
-                for child in ctx.node.children:
+                for child in ctx.node.child_view:
                     child_ctx = replace(ctx, node=child)
                     child_ctx.current_step.process_node(child_ctx)
                     ctx.statement_out.write("\n")
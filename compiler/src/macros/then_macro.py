@@ -2,7 +2,7 @@
 
 from dataclasses import replace
 from core.macro_registry import MacroContext, Macro_preprocess_provider
-from core.node import Args, Position
+from core.node import Position
 from pipeline.steps import PreprocessingStep
 from pipeline.local_lookup import Upwalker, LastThenSearchStrategy
 from utils.common_utils import get_single_arg
@@ -170,7 +170,7 @@ class Pipeline_macro_provider(Macro_preprocess_provider):
         Continuation: `then do func`, `then get field`
         If-then: `then` with no inline args (just children) - existing behavior
         """
-        args = ctx.compiler.get_metadata(ctx.node, Args)
+        args = ctx.node.args
         content = ctx.node.content
         
         # Check if this is a continuation (starts with "then")
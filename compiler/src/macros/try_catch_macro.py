@@ -16,8 +16,7 @@ class Try_macro_provider(Macro_emission_provider):
 
 class Catch_macro_provider(Macro_emission_provider, Macro_preprocess_provider):
     def preprocess(self, ctx: MacroContext):
-        from core.node import Args
-        args = ctx.compiler.get_metadata(ctx.node, Args)
+        args = ctx.node.args
         
         # Optional error variable name
         error_var = args.strip() if args.strip() else "error"
@@ -30,8 +29,7 @@ class Catch_macro_provider(Macro_emission_provider, Macro_preprocess_provider):
             ctx.current_step.process_node(replace(ctx, node=child))
 
     def emission(self, ctx: MacroContext):
-        from core.node import Args
-        args = ctx.compiler.get_metadata(ctx.node, Args)
+        args = ctx.node.args
         
         # Optional error variable name
         error_var = args.strip() if args.strip() else "error"
@@ -5,29 +5,32 @@ from io import StringIO
 import json
 from pathlib import Path
 import argparse
-import os
 import sys
+import time
 import traceback
-from typing import Any, TextIO
+from typing import TYPE_CHECKING, Any, TextIO
 from utils.logger import configure_logger_from_args, default_logger
 
-# Parse args first to configure logging before any macro registrations
-parser = argparse.ArgumentParser()
-parser.add_argument('input_dir')
-parser.add_argument('output_file')
+if TYPE_CHECKING:
+    from compile_api import CompileOptions
+    from utils.profiler import CompileProfiler
+
+# prog spelled out, inside the compile server argv[0] is the server's
+parser = argparse.ArgumentParser(prog="main.py")
+parser.add_argument('input_dir', nargs='?')
+parser.add_argument('output_file', nargs='?')
 parser.add_argument('--errors-file', help="will output compilation errors and warnings (as JSON) into this file if specified")
 parser.add_argument('--log', help="comma-separated list of log tags to enable (e.g., 'typecheck,macro'). omit to disable all logging.")
 parser.add_argument('--expand', action='store_true', help="compile in two-step mode: .67lang → .67lang.expanded")
 parser.add_argument('--rte', action='store_true', help="compile in two-step mode: .67lang.expanded → .js")
-
-args = parser.parse_args()
-
-# configure logging based on command line args BEFORE importing modules that register macros
-configure_logger_from_args(args.log)
-
-# Now import modules that register macros (these will respect the logging configuration)
-from core.tree_parser import TreeParser
-from core.macrocosm import Macrocosm, create_macrocosm
+parser.add_argument('--batch', metavar='MANIFEST', help="compile every {input_dir, output_file, errors_file} entry of this JSON list in one process")
+parser.add_argument('--batch-summary', help="with --batch, write per-entry exit codes and timings (as JSON) into this file")
+parser.add_argument('--jobs', type=int, help="processes used to parse the input files. defaults to one per cpu; small inputs are always parsed serially")
+parser.add_argument('--no-parse-cache', action='store_true', help="parse every input file from scratch instead of reusing cached parse trees of unchanged files")
+parser.add_argument('--parse-cache-dir', metavar='DIR', help="keep the cached parse trees in this directory instead of compiler/.cache/parse")
+parser.add_argument('--profile', metavar='OUT_JSON', help="write where compile time went (stages, macro handlers, slowest nodes, peak memory) as JSON into this file")
+parser.add_argument('--trace', metavar='OUT_JSON', help="write a chrome trace (for perfetto or chrome://tracing) of the file parses, pipeline steps and nodes they walk into this file")
+parser.add_argument('--trace-handlers', type=float, metavar='MS', help="with --trace, also trace every macro handler call that takes at least this many milliseconds")
 
 def human_readable(inspections: list[dict[str, Any]]) -> None:
     for i, entry in enumerate(reversed(inspections), 1):
@@ -45,77 +48,132 @@ def write_json(inspections: list[dict[str, Any]], output: TextIO) -> None:
     output.write('\n')
     output.flush()
 
-
-
-default_logger.compile("starting compilation process")
-with default_logger.indent("compile", "initialization"):
-    input_path = Path(args.input_dir)
-    file_pattern = "*.67lang.expanded" if args.rte else "*.67lang"
-    result = list(input_path.rglob(file_pattern))
-    default_logger.compile(f"found {len(result)} .67lang files: {[str(f) for f in result]}")
-    its_just_macros = create_macrocosm()
-    
-    # Log macro registry summary if registry logging is enabled
-    
-    codegen_macros = ", ".join(its_just_macros.registries["emission"].all().keys())
-    typecheck_macros = ", ".join(its_just_macros.registries["typecheck"].all().keys())
-    preprocessor_macros = ", ".join(its_just_macros.registries["preprocess"].all().keys())
-    default_logger.registry(f"macro registry initialized with codegen macros: {codegen_macros}")
-    default_logger.registry(f"typecheck registry initialized with typecheck macros: {typecheck_macros}")  
-    default_logger.registry(f"preprocessor registry initialized with preprocessor macros: {preprocessor_macros}")
-
-parser = TreeParser()
-with default_logger.indent("compile", "parsing files"):
-    for filename in result:
-        default_logger.compile(f"parsing {filename}")
-        with open(filename) as file:
-            node = parser.parse_tree(file.read(), its_just_macros)
-            its_just_macros.register(node)
-
-crash = None
-compiled = None
-
-# Standard compilation: .67lang → (.js or .67lang.expanded)
-with default_logger.indent("compile", "single-step compilation"):
-    try:
-        compiled = its_just_macros.compile()
-    except Exception as e:
-        exc_info = sys.exc_info()
-        crash = ''.join(traceback.format_exception(*exc_info))
-        default_logger.compile(f"compilation crashed: {e}")
-
-if args.expand:
-    # Write .67lang.expanded instead of .js
-    # 
-    # TODO what happens if we had compile errors?
-    #  might need to think about this. might need to make this opt-in, it's useful
-    #  to write out the expansion for debugging but it is very much an invalid expansion.
-    #  oh! i know. wrap it in a `67lang.invalid_solution` which causes a compile error!
-    default_logger.compile(f"expand mode: writing expanded form to {args.output_file}")
-    with open(args.output_file, "w") as f:
-        for node in its_just_macros.nodes:
-            f.write(repr(node))
-            f.write("\n\n")
-else:
-    # Write .js output
-    if compiled:
-        default_logger.compile(f"compilation successful, writing output to {args.output_file}")
-        with open(args.output_file, "w") as f:
-            f.write(compiled)
-
-print("refactor confidently when the flame flickers.")
-
-if len(its_just_macros.compile_errors) != 0 or crash:
-    print(f"{len(its_just_macros.compile_errors)} compile errors.")
-    if len(its_just_macros.compile_errors) != 0:
-        if args.errors_file:
-            with open(args.errors_file, 'w') as f:
-                write_json(its_just_macros.compile_errors, f)
-            print(f"seek them in {args.errors_file}.")
+def compile_entry(input_dir: Path, output_file: Path, errors_file: Path | None, options: "CompileOptions", profiler: "CompileProfiler | None" = None) -> int:
+    from compile_api import collect_sources, compile_sources
+
+    default_logger.compile("starting compilation process")
+    with default_logger.indent("compile", "initialization"):
+        files = collect_sources(input_dir, options)
+    result = compile_sources(files, options, profiler=profiler)
+
+    if options.expand:
+        # Write .67lang.expanded instead of .js
+        default_logger.compile("expand mode: writing expanded form to {}", output_file)
+        with open(output_file, "w") as f:
+            f.write(result.expanded)
+    elif result.js:
+        default_logger.compile("compilation successful, writing output to {}", output_file)
+        with open(output_file, "w") as f:
+            f.write(result.js)
+
+    print("refactor confidently when the flame flickers.")
+
+    if result.ok:
+        return 0
+
+    print(f"{len(result.errors)} compile errors.")
+    if len(result.errors) != 0:
+        if errors_file:
+            with open(errors_file, 'w') as f:
+                write_json(result.errors, f)
+            print(f"seek them in {errors_file}.")
         else:
-            human_readable(its_just_macros.compile_errors)
-    
-    if crash:
-        print(crash, end='')
-    
-    exit(1)
+            human_readable(result.errors)
+
+    if result.crash:
+        print(result.crash, end='')
+
+    return 1
+
+def compile_batch(manifest_path: Path, summary_path: Path | None, options: "CompileOptions", profiler: "CompileProfiler | None" = None) -> int:
+    """
+    compiles every manifest entry in this one process. entries look like
+    `{"input_dir": ..., "output_file": ..., "errors_file": ...}` (errors_file optional),
+    with relative paths resolved against the manifest's directory.
+    """
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    assert isinstance(manifest, list), f"{manifest_path} must contain a list of entries"
+    base = manifest_path.parent
+
+    summary: list[dict[str, Any]] = []
+    batch_start = time.perf_counter()
+    for entry in manifest:
+        input_dir = base / entry["input_dir"]
+        output_file = base / entry["output_file"]
+        errors_file = base / entry["errors_file"] if entry.get("errors_file") else None
+        print(f"batch: compiling {input_dir}")
+        start = time.perf_counter()
+        try:
+            exit_code = compile_entry(input_dir, output_file, errors_file, options, profiler)
+        except Exception:
+            # one broken project shouldn't take the rest of the batch down with it
+            traceback.print_exc(file=sys.stdout)
+            exit_code = 1
+        summary.append({
+            "input_dir": str(input_dir),
+            "output_file": str(output_file),
+            "exit_code": exit_code,
+            "seconds": round(time.perf_counter() - start, 6),
+        })
+
+    total = time.perf_counter() - batch_start
+    failed = [e for e in summary if e["exit_code"] != 0]
+    print(f"batch: {len(summary) - len(failed)}/{len(summary)} succeeded in {total:.3f}s.")
+    for e in failed:
+        print(f"batch: failed {e['input_dir']}")
+    if summary_path:
+        with open(summary_path, "w") as f:
+            json.dump({"total_seconds": round(total, 6), "entries": summary}, f, indent=2)
+            f.write("\n")
+    return 1 if failed else 0
+
+def main(argv: list[str] | None = None) -> int:
+    args = parser.parse_args(argv)
+    if args.batch is None and (args.input_dir is None or args.output_file is None):
+        parser.error("input_dir and output_file are required unless --batch is given")
+    if args.batch is not None and (args.input_dir is not None or args.errors_file is not None):
+        parser.error("--batch takes its inputs and outputs from the manifest")
+
+    # configure logging based on command line args BEFORE importing modules that register macros
+    configure_logger_from_args(args.log)
+    if args.trace is not None:
+        from utils.tracer import Tracer
+        default_logger.tracer = Tracer(args.trace_handlers)
+    elif args.trace_handlers is not None:
+        parser.error("--trace-handlers needs --trace")
+
+    # Now import modules that register macros (these will respect the logging configuration)
+    from compile_api import CompileOptions, shared_registries
+    if default_logger.registry.enabled:
+        # a warm process (compile server) has them already, and built them without logging.
+        # built again on first use, so the registration gets logged like in a fresh process
+        shared_registries.cache_clear()
+
+    options = CompileOptions(
+        expand=args.expand, rte=args.rte, jobs=args.jobs,
+        parse_cache=not args.no_parse_cache,
+        parse_cache_dir=Path(args.parse_cache_dir) if args.parse_cache_dir else None,
+    )
+    # a batch gets one profile, summed over all of its entries
+    profiler = None
+    if args.profile is not None:
+        from utils.profiler import CompileProfiler
+        profiler = CompileProfiler()
+    if args.batch is not None:
+        summary = Path(args.batch_summary) if args.batch_summary else None
+        exit_code = compile_batch(Path(args.batch), summary, options, profiler)
+    else:
+        errors_file = Path(args.errors_file) if args.errors_file else None
+        exit_code = compile_entry(Path(args.input_dir), Path(args.output_file), errors_file, options, profiler)
+    if profiler is not None:
+        with open(args.profile, "w") as f:
+            json.dump(profiler.report(), f, indent=2)
+            f.write("\n")
+    if default_logger.tracer is not None:
+        default_logger.tracer.write(args.trace)
+        default_logger.tracer = None
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -17,6 +17,7 @@ from pipeline.call_conventions import (
 
 # Import proper Type objects for returns
 from compiler_types.proper_types import STRING
+from pipeline.builtin_catalog import BuiltinCatalog
 
 if TYPE_CHECKING:
     from compiler_types.proper_types import Type
@@ -304,27 +305,5 @@ builtin_calls = {
     "finally": [PrototypeCall(constructor="Promise", fn="finally", demands=["Promise", "*"], returns="Promise")],
 }
 
-# Load TypeScript builtins if available
-try:
-    from compiler_types.typescript_builtins import typescript_calls
-    for name, calls in typescript_calls.items():
-        if name in builtin_calls:
-            builtin_calls[name].extend(calls)
-        else:
-            builtin_calls[name] = calls
-except ImportError as e:
-    # It's ok if the file doesn't exist - TypeScript builtins are generated separately
-    print(f"TypeScript builtins not found: {e}")
-    pass
-
-# Commented out WebIDL builtins - now using TypeScript definitions instead
-# try:
-#     from compiler_types.webidl_builtins import webidl_calls
-#     for name, calls in webidl_calls.items():
-#         if name in builtin_calls:
-#             builtin_calls[name].extend(calls)
-#         else:
-#             builtin_calls[name] = calls
-# except ImportError:
-#     # It's ok if the file doesn't exist
-#     pass
+# TypeScript builtins are merged in lazily, per name, on first lookup
+builtin_catalog = BuiltinCatalog(builtin_calls)
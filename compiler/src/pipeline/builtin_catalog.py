@@ -0,0 +1,140 @@
+"""Lazy, indexed catalog of builtin call overloads.
+
+`typescript_builtins.py` is tens of thousands of lines of call convention constructors,
+and importing it dominated compiler startup even though a typical program references a
+few dozen names. the catalog compiles it once into a compact on-disk index (name -> pickled
+overload list) and then only unpickles the overloads of the names that actually get looked up.
+"""
+
+import marshal
+import mmap
+import pickle
+import struct
+from pathlib import Path
+from typing import Any
+
+from utils.cache import CACHE_DIR, fingerprint, try_write_bytes
+from pipeline.overload_index import OverloadIndex
+
+SRC_DIR = Path(__file__).parent.parent
+TYPESCRIPT_BUILTINS = SRC_DIR / "compiler_types" / "typescript_builtins.py"
+# everything that decides what the pickled overloads look like
+CATALOG_SOURCES = [
+    TYPESCRIPT_BUILTINS,
+    SRC_DIR / "pipeline" / "call_conventions.py",
+    SRC_DIR / "compiler_types" / "proper_types.py",
+]
+CATALOG_PATH = CACHE_DIR / "builtin_catalog.bin"
+
+# magic, format version, source fingerprint, index length
+_HEADER = struct.Struct("<6sH32sQ")
+_MAGIC = b"67lcat"
+_FORMAT_VERSION = 1
+
+
+class BuiltinCatalog:
+    """
+    read-only mapping of builtin call name -> list of overloads.
+    handwritten overloads come first, TypeScript derived ones are appended after them.
+    """
+
+    def __init__(self, handwritten: dict[str, list[Any]], path: Path = CATALOG_PATH):
+        self._handwritten = handwritten
+        self._path = path
+        self._resolved: dict[str, list[Any]] = {}
+        self._indexes: dict[str, OverloadIndex] = {}
+        self._loaded = False
+        # name -> (offset, length) into self._blob
+        self._index: dict[str, tuple[int, int]] = {}
+        self._blob: memoryview | None = None
+        # set instead of the blob when this very run had to rebuild the index
+        self._fresh: dict[str, list[Any]] | None = None
+
+    def __contains__(self, name: str) -> bool:
+        self._ensure_loaded()
+        return name in self._handwritten or name in self._index
+
+    def __getitem__(self, name: str) -> list[Any]:
+        overloads = self.get(name)
+        if overloads is None:
+            raise KeyError(name)
+        return overloads
+
+    def get(self, name: str, default: list[Any] | None = None) -> list[Any] | None:
+        if name in self._resolved:
+            return self._resolved[name]
+        if name not in self:
+            return default
+        overloads = list(self._handwritten.get(name, []))
+        overloads.extend(self._load_typescript(name))
+        self._resolved[name] = overloads
+        return overloads
+
+    def index(self, name: str) -> OverloadIndex:
+        """get(name), grouped for resolving calls against it. an empty one for unknown names"""
+        index = self._indexes.get(name)
+        if index is None:
+            index = self._indexes[name] = OverloadIndex(self.get(name, []))
+        return index
+
+    def load(self) -> None:
+        """opens (or rebuilds) the index now instead of on the first lookup"""
+        self._ensure_loaded()
+
+    def _load_typescript(self, name: str) -> list[Any]:
+        if name not in self._index:
+            return []
+        if self._fresh is not None:
+            return self._fresh[name]
+        assert self._blob is not None
+        offset, length = self._index[name]
+        return pickle.loads(self._blob[offset:offset + length])
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if not TYPESCRIPT_BUILTINS.exists():
+            # it's ok if the file doesn't exist - TypeScript builtins are generated separately
+            print(f"TypeScript builtins not found: {TYPESCRIPT_BUILTINS}")
+            return
+        expected = fingerprint(CATALOG_SOURCES)
+        if not self._open_index(expected):
+            self._rebuild_index(expected)
+
+    def _open_index(self, expected: bytes) -> bool:
+        try:
+            with open(self._path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # OSError: not there, or not readable. ValueError: empty file, can't map it
+            return False
+        if len(mapped) < _HEADER.size:
+            return False
+        magic, version, stored, index_length = _HEADER.unpack_from(mapped)
+        if (magic, version, stored) != (_MAGIC, _FORMAT_VERSION, expected):
+            return False
+        view = memoryview(mapped)
+        self._index = marshal.loads(view[_HEADER.size:_HEADER.size + index_length])
+        self._blob = view[_HEADER.size + index_length:]
+        return True
+
+    def _rebuild_index(self, expected: bytes) -> None:
+        from compiler_types.typescript_builtins import typescript_calls
+
+        index: dict[str, tuple[int, int]] = {}
+        chunks: list[bytes] = []
+        offset = 0
+        for name, calls in typescript_calls.items():
+            chunk = pickle.dumps(calls, protocol=pickle.HIGHEST_PROTOCOL)
+            index[name] = (offset, len(chunk))
+            chunks.append(chunk)
+            offset += len(chunk)
+        index_bytes = marshal.dumps(index)
+        header = _HEADER.pack(_MAGIC, _FORMAT_VERSION, expected, len(index_bytes))
+        # unwritable, and every run pays for the import. still compiles though
+        try_write_bytes(self._path, b"".join([header, index_bytes, *chunks]))
+
+        # we already paid for the import, no point reading it all back
+        self._index = index
+        self._fresh = typescript_calls
@@ -2,15 +2,40 @@
 
 This module contains the logic for walking up the AST to find definitions
 in scope, which was previously buried in processor_base.py.
+
+a name is in scope if it's defined by an earlier sibling of the node looking for it, or of any of
+its ancestors, or by a child of such a sibling that's a `noscope`. the nearest definition wins,
+except that inside one `noscope` it's the first. looking for one used to mean going through all of
+those siblings, for every reference - quadratic in a long function body. now every node with
+children gets a ScopeTable of what they define, keyed by what lookups ask for, and a lookup is a
+probe into the table of each ancestor on the way up.
 """
 
+from bisect import bisect_left
 from dataclasses import replace, dataclass
-from typing import Protocol, Callable, Any
+from operator import itemgetter
+from typing import TYPE_CHECKING, Protocol
 from utils.common_utils import get_single_arg
 from utils.logger import default_logger
 from utils.strutil import cut
 from pipeline.steps import seek_child_macro
 
+if TYPE_CHECKING:
+    from core.macro_registry import MacroContext
+    from core.macrocosm import Macrocosm
+    from core.node import Node
+
+# the macros that define a local. TODO! really should stick to one or the other, not both...
+# (67lang:assume_local_exists is a hack, i hate it. find a better way!)
+LOCAL_MACROS = frozenset({"local", "67lang:assume_local_exists"})
+
+# ScopeTable keys next to the local names: locals a name lookup can't get past (they don't have a
+# single argument, and looking at one is a compile error), and locals holding a pipeline result
+BARRIER = object()
+LAST_THEN = object()
+
+_position = itemgetter(0)
+
 
 @dataclass
 class UpwalkerResult:
@@ -19,138 +44,184 @@ class UpwalkerResult:
     type: str
 
 
+class ScopeTable:
+    """
+    the definitions among one node's children, for the lookups of everything after them: key ->
+    (position, defining node), positions ascending. a `noscope` child counts as defining, at its
+    own position, whatever the first of its children does.
+
+    built lazily, and only as far down the children as lookups have asked for. an edit at some
+    position can't change what comes before it, so the Macrocosm cuts the table back to there
+    rather than throwing it away - a pipeline editing its way down a block only ever extends it.
+    """
+
+    def __init__(self, compiler: "Macrocosm", node: "Node"):
+        self.compiler = compiler
+        self.node = node
+        # the first `built` children are in
+        self.built = 0
+        self._entries: dict[object, list[tuple[int, "Node"]]] = {}
+        # every (position, key) in the order they went in, to cut back from the end
+        self._log: list[tuple[int, object]] = []
+
+    def nearest(self, key: object, index: int) -> "tuple[int, Node] | None":
+        """the entry for `key` closest before child `index`"""
+        if index > self.built:
+            self._extend(index)
+        entries = self._entries.get(key)
+        if not entries:
+            return None
+        i = bisect_left(entries, index, key=_position)
+        return entries[i - 1] if i else None
+
+    def cut(self, index: int) -> None:
+        """forgets what child `index` and the ones after it define"""
+        if index >= self.built:
+            return
+        log = self._log
+        while log and log[-1][0] >= index:
+            _, key = log.pop()
+            self._entries[key].pop()
+        self.built = index
+
+    def _add(self, position: int, key: object, node: "Node") -> None:
+        self._entries.setdefault(key, []).append((position, node))
+        self._log.append((position, key))
+
+    def _extend(self, index: int) -> None:
+        children = self.node.child_view
+        for position in range(self.built, index):
+            child = children[position]
+            if child.macro in LOCAL_MACROS:
+                for key in self._keys(child):
+                    self._add(position, key, child)
+            elif child.macro == "noscope":
+                # first come first served in here, and nothing after a barrier counts for names
+                seen: set[object] = set()
+                for inner in child.child_view:
+                    if inner.macro not in LOCAL_MACROS:
+                        continue
+                    for key in self._keys(inner):
+                        if key in seen or (BARRIER in seen and key is not LAST_THEN):
+                            continue
+                        seen.add(key)
+                        self._add(position, key, child if key is BARRIER else inner)
+        self.built = index
+
+    def _keys(self, local: "Node") -> list[object]:
+        """what a `local` or 67lang:assume_local_exists child goes into the table under"""
+        from core.node import SaneIdentifier
+        keys: list[object] = []
+        if local.macro == "local" and local.child_view and local.child_view[0].content == "67lang:last_then":
+            keys.append(LAST_THEN)
+        desired_local_name, extra = cut(local.args, " ")
+        if extra:
+            # get_single_arg would fail on it
+            keys.append(BARRIER)
+            return keys
+        keys.append(desired_local_name)
+        sane_local_name = self.compiler.maybe_metadata(local, SaneIdentifier)
+        if sane_local_name and sane_local_name != desired_local_name:
+            keys.append(sane_local_name)
+        return keys
+
+
 class SearchStrategy(Protocol):
     """Protocol for upwalker search strategies"""
+    def candidate(self, table: ScopeTable, index: int) -> "Node | None":
+        """the node in `table` nearest before child `index` that try_match has to look at"""
+        ...
+
     def try_match(self, ctx: "MacroContext") -> UpwalkerResult | None:
         """Try to match at the current node"""
         ...
-    
-    def search_in_noscope(self, ctx: "MacroContext") -> UpwalkerResult | None:
-        """Search inside a noscope node"""
-        ...
 
 
 class LocalNameSearchStrategy:
     """Search strategy for finding locals by name"""
-    
+
     def __init__(self, name: str):
         self.name = name
-    
+
+    def candidate(self, table: ScopeTable, index: int) -> "Node | None":
+        found = table.nearest(self.name, index)
+        barrier = table.nearest(BARRIER, index)
+        if barrier is not None and (found is None or barrier[0] > found[0]):
+            # the barrier fails try_match, same as when it was come across walking back to `found`
+            return barrier[1] if barrier[1].macro in LOCAL_MACROS else self._first_barrier(barrier[1])
+        return found[1] if found is not None else None
+
+    @staticmethod
+    def _first_barrier(noscope: "Node") -> "Node":
+        for inner in noscope.child_view:
+            if inner.macro in LOCAL_MACROS and cut(inner.args, " ")[1]:
+                return inner
+        assert False, "noscope barrier without a barrier in it" # internal assert
+
     def try_match(self, ctx: "MacroContext") -> UpwalkerResult | None:
         """Try to match a local variable definition at the current node"""
-        from core.node import Macro, SaneIdentifier, FieldDemandType
-        
-        # TODO! really should stick to one or the other, not both...
-        macro = ctx.compiler.get_metadata(ctx.node, Macro)
-        if macro == "local":
-            desired_local_name = get_single_arg(ctx)
-        elif macro == "67lang:assume_local_exists": # TODO - i hate this hack. find a better way!
-            desired_local_name = get_single_arg(ctx)
-        else:
+        from core.node import SaneIdentifier, FieldDemandType
+
+        if ctx.node.macro not in LOCAL_MACROS:
             return None
+        desired_local_name = get_single_arg(ctx)
         sane_local_name = ctx.compiler.maybe_metadata(ctx.node, SaneIdentifier) or desired_local_name
-        
+
         if self.name in {desired_local_name, sane_local_name}:
             # Found the local definition, try to get its type from metadata
-            default_logger.typecheck(f"LocalNameSearchStrategy: found {self.name} at {ctx.node.content}")
+            default_logger.typecheck("LocalNameSearchStrategy: found {} at {}", self.name, ctx.node.content)
             try:
                 demanded = ctx.compiler.get_metadata(ctx.node, FieldDemandType)
-                default_logger.typecheck(f"LocalNameSearchStrategy: found type {demanded} in metadata")
+                default_logger.typecheck("LocalNameSearchStrategy: found type {} in metadata", demanded)
                 return UpwalkerResult(ctx.node, demanded)  # Keep as Type object
             except KeyError:
-                default_logger.typecheck(f"LocalNameSearchStrategy: no type in metadata")
+                default_logger.typecheck("LocalNameSearchStrategy: no type in metadata")
                 # Fall back to looking for type node
                 type_node = seek_child_macro(ctx.node, "type")
                 if type_node:
                     _, demanded = cut(type_node.content, " ")
                     return UpwalkerResult(ctx.node, demanded)
                 return UpwalkerResult(ctx.node, "*")
-    
-    def search_in_noscope(self, ctx: "MacroContext") -> UpwalkerResult | None:
-        """Search for local definitions inside a noscope node"""
-        for child in ctx.node.children:
-            child_ctx = replace(ctx, node=child)
-            result = self.try_match(child_ctx)
-            if result is not None:
-                return result
         return None
 
 
 class LastThenSearchStrategy:
     """Search strategy for finding locals with 67lang:last_then marker"""
-    
+
+    def candidate(self, table: ScopeTable, index: int) -> "Node | None":
+        found = table.nearest(LAST_THEN, index)
+        return found[1] if found is not None else None
+
     def try_match(self, ctx: "MacroContext") -> UpwalkerResult | None:
         """Try to match a local with 67lang:last_then marker"""
-        from core.node import Macro
-        
-        try:
-            macro = ctx.compiler.get_metadata(ctx.node, Macro)
-            if macro == "local":
-                # Check if this local has 67lang:last_then as first child
-                if (len(ctx.node.children) > 0 and 
-                    ctx.node.children[0].content == "67lang:last_then"):
-                    return UpwalkerResult(ctx.node, "*")  # Type doesn't matter for pipeline
-        except KeyError:
-            pass
-        return None
-    
-    def search_in_noscope(self, ctx: "MacroContext") -> UpwalkerResult | None:
-        """Search for locals with 67lang:last_then inside a noscope node"""
-        for child in ctx.node.children:
-            child_ctx = replace(ctx, node=child)
-            result = self.try_match(child_ctx)
-            if result is not None:
-                return result
-        return None
+        return UpwalkerResult(ctx.node, "*")  # Type doesn't matter for pipeline
 
 
 class Upwalker:
     """Generic upwalker for scope resolution with pluggable search strategies"""
-    
+
     def __init__(self, strategy: SearchStrategy):
         self.strategy = strategy
-    
+
     def find(self, ctx: "MacroContext") -> UpwalkerResult | None:
         """Walk up the AST to find a definition using the configured strategy"""
-        from core.node import Macro
-        
-        current = ctx.node
         compiler = ctx.compiler
-        while current:
-            current_ctx = replace(ctx, node=current)
-            
+        current = ctx.node
+        while current.parent is not None:
+            parent = current.parent
             # Check siblings that come before this node
-            if current.parent:
-                siblings = current.parent.children
-                current_index = None
-                try:
-                    current_index = siblings.index(current)
-                except ValueError:
-                    pass
-                
-                if current_index is not None:
-                    # Check preceding siblings (nearest to first)
-                    for i in range(current_index - 1, -1, -1):
-                        sibling = siblings[i]
-                        # First check if the sibling itself matches
-                        sibling_ctx = replace(current_ctx, node=sibling)
-                        result = self.strategy.try_match(sibling_ctx)
-                        if result is not None:
-                            return result
-                        
-                        # Also check inside noscope nodes
-                        try:
-                            macro = compiler.get_metadata(sibling, Macro)
-                            if macro == "noscope":
-                                result = self.strategy.search_in_noscope(sibling_ctx)
-                                if result is not None:
-                                    return result
-                        except KeyError:
-                            pass
-            
+            try:
+                index = parent.index_of_child(current)
+            except ValueError:
+                index = None
+            if index is not None:
+                node = self.strategy.candidate(compiler.scope_table(parent), index)
+                if node is not None:
+                    return self.strategy.try_match(replace(ctx, node=node))
+
             # Move up to parent
-            current = current.parent
-        
+            current = parent
+
         return None  # Not found
 
 
@@ -164,4 +235,4 @@ def walk_upwards_for_local_definition(ctx: "MacroContext", name: str):
 
 
 # Convenience type alias for backward compatibility
-LocalMatchResult = UpwalkerResult
\ No newline at end of file
+LocalMatchResult = UpwalkerResult
@@ -0,0 +1,44 @@
+"""
+the overloads of one call name, grouped so resolving a call only unifies against the ones that
+can fit it.
+
+popular names (`length`, `slice`, `get`...) carry hundreds of typescript derived overloads, and
+resolution used to run the full signature match against each. an overload only ever matches a
+call with exactly as many arguments as it demands (or when it demands nothing in particular, None),
+and only if its first demand takes the first argument - the receiver, for the prototype calls that
+make up most of them. so they're grouped by arity, then by first demand, and a whole group goes
+when its first demand doesn't fit. that check has to be exactly as permissive as the full match
+is at position 0, see Call_macro_provider.
+"""
+
+from typing import Any, Callable, Sequence
+
+# the first demand key of the overloads that demand no arguments at all
+_NO_RECEIVER = object()
+
+
+class OverloadIndex:
+    def __init__(self, overloads: Sequence[Any]):
+        self.overloads = overloads
+        # positions into overloads, so the candidates can come out in the order they were given in
+        self._untyped: list[int] = []
+        self._by_arity: dict[int, dict[Any, list[int]]] = {}
+        for i, overload in enumerate(overloads):
+            demands = overload.demands
+            if demands is None:
+                self._untyped.append(i)
+                continue
+            receiver = demands[0] if demands else _NO_RECEIVER
+            self._by_arity.setdefault(len(demands), {}).setdefault(receiver, []).append(i)
+
+    def candidates(self, arg_count: int, receiver_fits: Callable[[Any], bool] | None = None) -> list[Any]:
+        """
+        the overloads that could take `arg_count` arguments, in their original order. with
+        `receiver_fits`, only those whose first demand it accepts (it's asked once per distinct one)
+        """
+        positions = list(self._untyped)
+        for receiver, group in self._by_arity.get(arg_count, {}).items():
+            if receiver_fits is None or receiver is _NO_RECEIVER or receiver_fits(receiver):
+                positions.extend(group)
+        positions.sort()
+        return [self.overloads[i] for i in positions]
@@ -1,11 +1,13 @@
 """Processing steps for the 67lang compilation pipeline."""
 
-from .base import MacroProcessingStep
+from .base import MacroProcessingStep, SparseMacroStep
+from .traversal import Visitor, walk
 from .preprocessing import PreprocessingStep
 from .type_registration import TypeRegistrationStep
 from .typechecking import TypeCheckingStep
 from .emission import JavaScriptEmissionStep
 from .must_compile_error_step import MustCompileErrorVerificationStep
+from .schedule import FusedSparseSteps, schedule_steps
 from .utils import (
     unroll_parent_chain, 
     seek_child_macro, 
@@ -16,11 +18,16 @@ from .utils import (
 
 __all__ = [
     'MacroProcessingStep', 
+    'SparseMacroStep',
+    'Visitor',
+    'walk',
     'PreprocessingStep',
     'TypeRegistrationStep', 
     'TypeCheckingStep',
     'JavaScriptEmissionStep',
     'MustCompileErrorVerificationStep',
+    'FusedSparseSteps',
+    'schedule_steps',
     'unroll_parent_chain',
     'seek_child_macro',
     'seek_all_child_macros', 
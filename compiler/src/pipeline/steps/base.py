@@ -1,17 +1,109 @@
 """Base classes for processing steps."""
 
 from abc import ABC, abstractmethod
-from core.macro_registry import MacroContext, MacroRegistry
+from collections.abc import Callable, Iterable
+from typing import Any
+from dataclasses import replace
+from contextlib import AbstractContextManager
+from core.macro_registry import Macro, MacroContext, MacroRegistry
+from core.node import Node
+from utils.logger import default_logger
+from .traversal import walk
 
 
 class MacroProcessingStep(ABC):
-    """Base class for macro processing steps in the compilation pipeline"""
-    
+    """
+    Base class for macro processing steps in the compilation pipeline.
+    also a Visitor (see traversal.py), so a step can `walk` down to the nodes it has providers for
+    """
+
+    # whether the providers move nodes around, which makes `walk` go over copies of the child lists
+    edits_tree = False
+
+    # steps that have to be done before this one starts, see schedule.py
+    depends_on: tuple[type["MacroProcessingStep"], ...] = ()
+
     def __init__(self):
         # Steps should override this if they need specific registries
         self.macros = MacroRegistry()
-        
+        # the frozen registry, see MacroRegistry.freeze
+        self.dispatch: dict[str, Macro] = {}
+        # log indents opened by enter and not yet closed by exit, see open_log_indent
+        self._log_indents: list[AbstractContextManager] = []
+
     @abstractmethod
     def process_node(self, ctx: MacroContext) -> None:
         """Process a single node during this step"""
-        pass
\ No newline at end of file
+        pass
+
+    @property
+    def name(self) -> str:
+        return type(self).__name__
+
+    def wants(self, macro: str) -> bool:
+        """
+        whether this step has anything to do for a node with `macro`. a step that overrides this
+        may skip any subtree where it's False for every node, see Macrocosm.worth_visiting
+        """
+        return True
+
+    def enter(self, ctx: MacroContext) -> bool:
+        """
+        the adapter between `walk` and the providers: a node with a provider goes to it, and the
+        provider does what it likes with the children. a node without one just gets walked through
+        """
+        handler = self.dispatch.get(ctx.node.macro)
+        if handler is None:
+            return True
+        with ctx.compiler.safely:
+            handler(ctx)
+        return False
+
+    def exit(self, ctx: MacroContext) -> None:
+        pass
+
+    def walk(self, ctx: MacroContext) -> None:
+        """this step's enter/exit over `ctx.node` and its subtree, minus whatever it doesn't want"""
+        open_indents = len(self._log_indents)
+        try:
+            walk(ctx, self, prune=self, snapshot=self.edits_tree)
+        finally:
+            # an exception skips exit, which would have closed these
+            while len(self._log_indents) > open_indents:
+                self.close_log_indent()
+
+    def open_log_indent(self, tag: str, message: str | Callable[..., str], *args: Any, node: Node | None = None) -> None:
+        """default_logger.indent for a hook pair: opened here in enter, closed in exit"""
+        indent = default_logger.indent(tag, message, *args, node=node)
+        indent.__enter__()
+        self._log_indents.append(indent)
+
+    def close_log_indent(self) -> None:
+        self._log_indents.pop().__exit__(None, None, None)
+
+
+class SparseMacroStep(MacroProcessingStep):
+    """
+    a step that acts on a handful of macros and nothing else. instead of walking the whole tree
+    it gets handed just the nodes with those macros, in document order, from the macro index
+    (see Macrocosm.nodes_with_macros)
+    """
+
+    @abstractmethod
+    def handled_macros(self) -> Iterable[str]:
+        """the macros this step wants to see"""
+        pass
+
+    @abstractmethod
+    def process_match(self, ctx: MacroContext) -> None:
+        """Process one node with a handled macro"""
+        pass
+
+    def process_node(self, ctx: MacroContext) -> None:
+        assert ctx.node is ctx.compiler.root_node, "sparse steps run over the whole tree" # internal assert
+        self.process_matches(ctx, ctx.compiler.nodes_with_macros(self.handled_macros()))
+
+    def process_matches(self, ctx: MacroContext, nodes: list[Node]) -> None:
+        """the whole step, given every node with a handled macro. fused steps start here, see schedule.py"""
+        for node in nodes:
+            self.process_match(replace(ctx, node=node))
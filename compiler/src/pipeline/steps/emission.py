@@ -1,10 +1,9 @@
 """JavaScript emission step implementation."""
 
 from dataclasses import replace
-from contextlib import contextmanager
 from .base import MacroProcessingStep
+from .typechecking import TypeCheckingStep
 from core.macro_registry import MacroContext, MacroRegistry
-from core.node import Macro
 from utils.logger import default_logger
 from utils.error_types import ErrorType
 from utils.strutil import IndentedStringIO
@@ -12,58 +11,54 @@ from utils.strutil import IndentedStringIO
 
 class JavaScriptEmissionStep(MacroProcessingStep):
     """Handles JavaScript code emission"""
+
+    # goes by the conventions and types typechecking settled on
+    depends_on = (TypeCheckingStep,)
     
     def __init__(self, macros: MacroRegistry):
         super().__init__()
         # Use the unified macros registry
         self.macros = macros
+        # no wants() here, every node gets emitted or is an unknown macro
+        self.dispatch = macros.freeze()
         
     def process_node(self, ctx: MacroContext) -> None:
         """Process a single node for JavaScript emission"""
-        from pipeline.js_conversion import js_lib
-        
-        macro = str(ctx.compiler.get_metadata(ctx.node, Macro))
-        all_macros = self.macros.all()
-        
-        default_logger.codegen(f"emitting JavaScript for macro: {macro}")
-
-        # --- cursed Python begins ---
-
-        @contextmanager
-        def possibly_wrapped(ctx: MacroContext):
-            # no wrapping needed
-            yield ctx
-
+        macro = ctx.node.macro
+        default_logger.codegen("emitting JavaScript for macro: {}", macro)
         if ctx.node.content == "67lang:solution":
-            default_logger.codegen("wrapping solution in JavaScript runtime setup")
-            @contextmanager
-            def definitely_wrapped(ctx: MacroContext):
-                out = IndentedStringIO()
-                out.write(js_lib + "\n\n")
-                # need to wrap this crap in async because browsers are GARBAGE 
-                # (top level await only in modules? why?!)
-                default_logger.codegen("adding async wrapper for browser compatibility")
-                out.write("void (async () => {\n")
-                with out:
-                    out.write("'use strict';\n")
-                    out.write("const scope = globalThis;\n")
-                    yield replace(ctx, statement_out=out, expression_out=out)
-                out.write("\n})();")
-                ctx.compiler._js_output = out.getvalue()
-                default_logger.codegen(f"JavaScript output generated: {len(out.getvalue())} characters")
-            possibly_wrapped = definitely_wrapped
+            self._emit_solution(ctx)
+        else:
+            self._emit(ctx, macro)
 
-        # --- cursed Python ends ---
+    def _emit(self, ctx: MacroContext, macro: str) -> None:
+        handler = self.dispatch.get(macro)
+        if handler is not None:
+            default_logger.codegen("applying JavaScript emission macro: {}", macro)
+            with ctx.compiler.safely:
+                handler(ctx)
+        else:
+            default_logger.codegen("ERROR: unknown macro {}", macro)
+            # If there are already compile errors, don't crash - just skip this node
+            if len(ctx.compiler.compile_errors) > 0:
+                default_logger.codegen("skipping malformed node due to existing compile errors")
+                return
+            ctx.compiler.compile_error(ctx.node, f"unknown macro '{macro}' - is this supposed to exist? did you maybe typo something?", ErrorType.INVALID_MACRO)
+
+    def _emit_solution(self, ctx: MacroContext) -> None:
+        from pipeline.js_conversion import js_lib
 
-        with possibly_wrapped(ctx) as ctx:
-            if macro in all_macros:
-                default_logger.codegen(f"applying JavaScript emission macro: {macro}")
-                with ctx.compiler.safely:
-                    all_macros[macro](ctx)
-            else:
-                default_logger.codegen(f"ERROR: unknown macro {macro}")
-                # If there are already compile errors, don't crash - just skip this node
-                if len(ctx.compiler.compile_errors) > 0:
-                    default_logger.codegen(f"skipping malformed node due to existing compile errors")
-                    return
-                ctx.compiler.compile_error(ctx.node, f"unknown macro '{macro}' - is this supposed to exist? did you maybe typo something?", ErrorType.INVALID_MACRO)
\ No newline at end of file
+        default_logger.codegen("wrapping solution in JavaScript runtime setup")
+        out = IndentedStringIO()
+        out.write(js_lib + "\n\n")
+        # need to wrap this crap in async because browsers are GARBAGE 
+        # (top level await only in modules? why?!)
+        default_logger.codegen("adding async wrapper for browser compatibility")
+        out.write("void (async () => {\n")
+        with out:
+            out.write("'use strict';\n")
+            out.write("const scope = globalThis;\n")
+            self._emit(replace(ctx, statement_out=out, expression_out=out), ctx.node.macro)
+        out.write("\n})();")
+        ctx.compiler._js_output = out.getvalue()
+        default_logger.codegen("JavaScript output generated: {} characters", len(out.getvalue()))
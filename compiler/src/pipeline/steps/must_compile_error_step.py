@@ -1,49 +1,48 @@
-from pipeline.steps import MacroProcessingStep
+from pipeline.steps.base import SparseMacroStep
+from pipeline.steps.utils import unroll_parent_chain
+from pipeline.steps.emission import JavaScriptEmissionStep
+from pipeline.steps.typechecking import TypeCheckingStep
 from core.macro_registry import MacroContext
-from dataclasses import replace
-from utils.strutil import IndentedStringIO
+from core.node import Node
 from utils.logger import default_logger
 
 
-class MustCompileErrorVerificationStep(MacroProcessingStep):
-    """Step that handles must_compile_error nodes - extracts expectations, processes children, and verifies errors."""
+class MustCompileErrorVerificationStep(SparseMacroStep):
+    """Step that handles must_compile_error nodes - extracts expectations and verifies errors."""
+
+    # checks the errors every other step reported
+    depends_on = (TypeCheckingStep, JavaScriptEmissionStep)
     
     def __init__(self):
         super().__init__()
         self.expectations = []  # Store expectations as we find them
-        
-    def process_node(self, ctx: MacroContext) -> None:
-        """Process node using standard tree walking, handling must_compile_error nodes as we encounter them."""
-        from core.node import Macro
-        
-        # Handle current node if it's must_compile_error
-        macro = str(ctx.compiler.get_metadata(ctx.node, Macro))
-        if macro == "must_compile_error":
-            expected_errors = self._extract_expectations_from_node(ctx, ctx.node)
-            if expected_errors is not None:
-                self.expectations.append({
-                    'node': ctx.node,
-                    'expected_errors': expected_errors
-                })
-            # Don't process children - they were already processed by earlier steps
-        else:
-            # Process children for non-must_compile_error nodes (standard tree walking pattern)
-            for child in ctx.node.children:
-                child_ctx = replace(ctx, node=child)
-                self.process_node(child_ctx)
-        
-        # At the solution level, verify all collected expectations
-        if ctx.node.content == "67lang:solution":
-            self._verify_expectations(ctx, self.expectations)
-            self.expectations = []  # Reset for next compilation
+
+    def handled_macros(self):
+        return ("must_compile_error",)
+
+    def process_matches(self, ctx: MacroContext, nodes: list[Node]) -> None:
+        super().process_matches(ctx, nodes)
+        # every must_compile_error has been seen, verify all collected expectations
+        self._verify_expectations(ctx, self.expectations)
+        self.expectations = []  # Reset for next compilation
+
+    def process_match(self, ctx: MacroContext) -> None:
+        # one inside another's children is left alone, like the tree walk this used to be never went in there
+        if any(n.macro == "must_compile_error" for n in unroll_parent_chain(ctx.node.parent)):
+            return
+        expected_errors = self._extract_expectations_from_node(ctx, ctx.node)
+        if expected_errors is not None:
+            self.expectations.append({
+                'node': ctx.node,
+                'expected_errors': expected_errors
+            })
         
     def _extract_expectations_from_node(self, ctx: MacroContext, node):
         """Extract expected errors from a must_compile_error node."""
         from utils.error_types import ErrorType
-        from core.node import Args
         
-        args = ctx.compiler.get_metadata(node, Args)
-        default_logger.macro(f"must_compile_error with args: '{args}'")
+        args = node.args
+        default_logger.macro("must_compile_error with args: '{}'", args)
         
         # Parse expected errors from args: "ERROR_TYPE=line ERROR_TYPE2=line2" or "ERROR_TYPE=+offset"
         expected_errors = {}
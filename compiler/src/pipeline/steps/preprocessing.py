@@ -1,9 +1,7 @@
 """Preprocessing step implementation."""
 
-from dataclasses import replace
 from .base import MacroProcessingStep
 from core.macro_registry import MacroContext, MacroRegistry
-from core.node import Macro
 from utils.logger import default_logger
 from utils.error_types import ErrorType
 
@@ -15,35 +13,32 @@ class PreprocessingStep(MacroProcessingStep):
         super().__init__()
         # Move preprocessor macros into this step
         self.macros = macros
+        self.dispatch = macros.freeze()
+
+    # preprocessors hoist and rewrite nodes mid-walk
+    edits_tree = True
+
+    def wants(self, macro: str) -> bool:
+        # the indentation check below fires on content starting with whitespace, which cuts
+        # to an empty macro or one starting with whitespace
+        return macro in self.dispatch or not macro or macro[0].isspace()
         
     def process_node(self, ctx: MacroContext) -> None:
-        """Process a single node using the preprocessor registry"""
-        default_logger.macro(f"preprocessing node: {ctx.node.content}")
-        
+        """Preprocess a node and whatever under it has preprocessors"""
+        self.walk(ctx)
+
+    def enter(self, ctx: MacroContext) -> bool:
+        default_logger.macro("preprocessing node: {}", ctx.node.content)
+
         # Validate indentation: ensure content doesn't start with whitespace
         if ctx.node.content and ctx.node.content[0].isspace():
             ctx.compiler.compile_error(ctx.node, 
                 "this language only accepts tabs for indentation, not spaces! spaces are like, totally uncool. use tabs instead, they're way more precise and semantic.", 
                 ErrorType.INVALID_INDENTATION)
             # Don't return early - let the processing continue so we don't break the pipeline
-        
-        # Process current node  
-        macro = str(ctx.compiler.get_metadata(ctx.node, Macro))
-        all_preprocessors = self.macros.all()
-
-        default_logger.macro(f"  -> Current node macro: {macro}")
-        default_logger.macro(f"  -> Available preprocessors: {list(all_preprocessors.keys())}")
-
-        if macro in all_preprocessors:
-            default_logger.macro(f"applying preprocessor for macro: {macro}")
-            with ctx.compiler.safely:
-                all_preprocessors[macro](ctx)
-        else:
-            default_logger.macro(f"no preprocessor for macro: {macro}")
-            # Process children if no specific preprocessor is found for the current node
-            with default_logger.indent("macro", f"preprocessing children of {ctx.node.content}"):
-                for i, child in enumerate(ctx.node.children):
-                    with default_logger.indent("macro", f"child {i}: {child.content}"):
-                        with ctx.compiler.safely:
-                            child_ctx = replace(ctx, node=child)
-                            self.process_node(child_ctx)
\ No newline at end of file
+
+        self.open_log_indent("macro", "preprocessing {}", ctx.node.content, node=ctx.node)
+        return super().enter(ctx)
+
+    def exit(self, ctx: MacroContext) -> None:
+        self.close_log_indent()
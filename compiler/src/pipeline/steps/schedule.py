@@ -0,0 +1,76 @@
+"""
+orders the pipeline steps by what they declare they need (MacroProcessingStep.depends_on) and
+fuses the ones that can share a traversal.
+
+so far the only traversal worth sharing is the sparse steps' macro index lookup: a run of them
+that doesn't touch the tree gets the union of their matches once, and every step in the run
+goes over its own share of that list, in dependency order. that's how the two type registration
+passes end up costing one lookup, with the detail pass going over the `type` nodes the first one
+was handed. a new analysis that only needs a few macros can ride along the same way, by being a
+SparseMacroStep and saying what it comes after.
+"""
+
+from dataclasses import replace
+from typing import Iterable
+
+from core.macro_registry import MacroContext
+from utils.profiler import stage
+from .base import MacroProcessingStep, SparseMacroStep
+
+
+class FusedSparseSteps(MacroProcessingStep):
+    """a run of sparse steps served by one macro index lookup, see schedule_steps"""
+
+    def __init__(self, steps: list[SparseMacroStep]) -> None:
+        super().__init__()
+        assert all(not step.edits_tree for step in steps), "fused steps would see a stale node list" # internal assert
+        self.steps = steps
+        self.handled = [frozenset(step.handled_macros()) for step in steps]
+
+    def process_node(self, ctx: MacroContext) -> None:
+        assert ctx.node is ctx.compiler.root_node, "sparse steps run over the whole tree" # internal assert
+        nodes = ctx.compiler.nodes_with_macros(frozenset().union(*self.handled))
+        # the Macrocosm leaves the timing of a fused run to it, so the profile still has a stage per step
+        for step, handled in zip(self.steps, self.handled):
+            with stage(ctx.compiler.profiler, step.name):
+                step.process_matches(replace(ctx, current_step=step), [node for node in nodes if node.macro in handled])
+
+    @property
+    def name(self) -> str:
+        return "+".join(step.name for step in self.steps)
+
+    def __repr__(self) -> str:
+        return f"FusedSparseSteps({self.name})"
+
+
+def schedule_steps(steps: Iterable[MacroProcessingStep]) -> list[MacroProcessingStep]:
+    """
+    `steps` in an order where every step comes after the ones its depends_on names. steps that
+    don't care about each other keep the order they were given in. neighbouring sparse steps that
+    leave the tree alone come back fused into one FusedSparseSteps
+    """
+    pending = list(steps)
+    ordered: list[MacroProcessingStep] = []
+    while pending:
+        # the first pending step whose dependencies are all in already
+        for i, step in enumerate(pending):
+            if not any(other is not step and isinstance(other, step.depends_on) for other in pending):
+                break
+        else:
+            raise ValueError(f"steps depend on each other in a cycle: {[type(step).__name__ for step in pending]}")
+        ordered.append(pending.pop(i))
+
+    scheduled: list[MacroProcessingStep] = []
+    run: list[SparseMacroStep] = []
+    for step in ordered + [None]:
+        if isinstance(step, SparseMacroStep) and not step.edits_tree:
+            run.append(step)
+            continue
+        if len(run) > 1:
+            scheduled.append(FusedSparseSteps(run))
+        else:
+            scheduled.extend(run)
+        run = []
+        if step is not None:
+            scheduled.append(step)
+    return scheduled
@@ -0,0 +1,73 @@
+"""
+iterative tree walk for the pipeline steps.
+
+a step used to walk down to the nodes it cares about by calling its own `process_node` once
+per level, with a fresh `MacroContext` for every child. that's a python frame and a dataclass
+copy per node, and a deep enough tree runs into the recursion limit. `walk` keeps its own stack
+instead and hands the visitor one context per depth, reused for every node at that depth.
+
+macro providers don't change: they still get a context, and still take care of their own children
+(usually by calling back into `step.process_node`, which starts a walk of its own).
+MacroProcessingStep.enter is the adapter that hands a node to its provider, if it has one.
+"""
+
+from copy import copy
+from typing import TYPE_CHECKING, Protocol
+
+from core.macro_registry import MacroContext
+
+if TYPE_CHECKING:
+    from .base import MacroProcessingStep
+
+
+class Visitor(Protocol):
+    def enter(self, ctx: MacroContext) -> bool:
+        """on the way down. True walks the node's children next, False skips them"""
+        ...
+
+    def exit(self, ctx: MacroContext) -> None:
+        """on the way back up, after the children. called for every node enter was called for"""
+        ...
+
+
+def walk(
+    ctx: MacroContext,
+    visitor: Visitor,
+    prune: "MacroProcessingStep | None" = None,
+    snapshot: bool = False,
+) -> None:
+    """
+    preorder enter and postorder exit over `ctx.node` and everything under it.
+
+    the context the visitor gets below the root is only good until the hook returns, the next node
+    at the same depth gets the same object. copy it (`dataclasses.replace`) to keep it around.
+    with `prune`, children that step has nothing to do in are skipped, see Macrocosm.worth_visiting.
+    the children are iterated live, so moving them around mid-walk raises (see ChildView), unless
+    `snapshot` is set, then every node walks the children it had when it was entered.
+    an exception goes straight through, skipping the exit of every node it unwinds.
+    """
+    if not visitor.enter(ctx):
+        visitor.exit(ctx)
+        return
+    compiler = ctx.compiler
+    node = ctx.node
+    # frames[depth] is the context for nodes at that depth, stack[depth - 1] iterates their siblings
+    frames = [ctx]
+    stack = [iter(node.children if snapshot else node.child_view)]
+    while stack:
+        child = next(stack[-1], None)
+        if child is None:
+            stack.pop()
+            visitor.exit(frames[len(stack)])
+            continue
+        if prune is not None and not compiler.worth_visiting(child, prune):
+            continue
+        depth = len(stack)
+        if depth == len(frames):
+            frames.append(copy(frames[0]))
+        frame = frames[depth]
+        frame.node = child
+        if visitor.enter(frame):
+            stack.append(iter(child.children if snapshot else child.child_view))
+        else:
+            visitor.exit(frame)
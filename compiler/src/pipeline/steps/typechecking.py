@@ -1,37 +1,47 @@
 """Type checking step implementation."""
 
-from dataclasses import replace
 from .base import MacroProcessingStep
+from .type_registration import TypeRegistrationStep
 from core.macro_registry import MacroContext, MacroRegistry
-from core.node import Macro
 from utils.logger import default_logger
 
 
 class TypeCheckingStep(MacroProcessingStep):
     """Handles type checking"""
+
+    # needs every type and fn registered, both passes (the detail one is a TypeRegistrationStep too)
+    depends_on = (TypeRegistrationStep,)
     
     def __init__(self, macros: MacroRegistry):
         super().__init__()
         # Use the unified typecheck registry
         self.macros = macros
+        self.dispatch = macros.freeze()
+
+    def wants(self, macro: str) -> bool:
+        return macro in self.dispatch
         
-    def process_node(self, ctx: MacroContext) -> None:
-        """Type check a single node"""
-        macro = str(ctx.compiler.get_metadata(ctx.node, Macro))
-        all_macros = self.macros.all()
-        
-        # Create a description for this node for indentation
-        node_desc = f"node {macro}"
-        if hasattr(ctx.node, 'content') and ctx.node.content:
-            # Limit content preview to keep it readable
-            content_preview = ctx.node.content[:50] + ("..." if len(ctx.node.content) > 50 else "")
-            node_desc = f"node {macro}: {content_preview}"
-        
-        with default_logger.indent("typecheck", node_desc):
-            if macro in all_macros:
-                with ctx.compiler.safely:
-                    return all_macros[macro](ctx)
-            else:
-                for child in ctx.node.children:
-                    child_ctx = replace(ctx, node=child)
-                    self.process_node(child_ctx)
\ No newline at end of file
+    def process_node(self, ctx: MacroContext) -> str | None:
+        """Type check a node, returning its type if it has a typecheck provider"""
+        handler = self.dispatch.get(ctx.node.macro)
+        if handler is None:
+            self.walk(ctx)
+            return None
+        # providers hand back the node's type, which walk would drop, so the node asked about
+        # directly goes to its provider right here
+        with default_logger.typecheck.indent(self._describe, ctx.node, node=ctx.node):
+            with ctx.compiler.safely:
+                return handler(ctx)
+
+    def enter(self, ctx: MacroContext) -> bool:
+        self.open_log_indent("typecheck", self._describe, ctx.node, node=ctx.node)
+        return super().enter(ctx)
+
+    def exit(self, ctx: MacroContext) -> None:
+        self.close_log_indent()
+
+    @staticmethod
+    def _describe(node) -> str:
+        # Limit content preview to keep it readable
+        content_preview = node.content[:50] + ("..." if len(node.content) > 50 else "")
+        return f"node {node.macro}: {content_preview}" if node.content else f"node {node.macro}"
@@ -1,7 +1,5 @@
 """Utility functions for processing steps."""
 
-from utils.strutil import cut
-
 
 def unroll_parent_chain(n) -> list:
     """Walk up the parent chain and return all nodes"""
@@ -15,17 +13,15 @@ def unroll_parent_chain(n) -> list:
 
 def seek_child_macro(n, macro: str):
     """Find a child node with a specific macro"""
-    for child in n.children:
-        m, _ = cut(child.content, " ")
-        if macro == m:
+    for child in n.child_view:
+        if child.macro == macro:
             return child
         
 
 def seek_all_child_macros(n, macro: str):
     """Find all child nodes with a specific macro"""
-    for child in n.children:
-        m, _ = cut(child.content, " ")
-        if macro == m:
+    for child in n.child_view:
+        if child.macro == macro:
             yield child
 
 
@@ -33,7 +29,4 @@ TYPICAL_IGNORED_MACROS = {"type", "noscope"}
 
 def filter_child_macros(n):
     """Filter out typical ignored macros from children"""
-    def get_macro(n): 
-        macro, _ = cut(n.content, " ")
-        return macro
-    return [c for c in n.children if get_macro(c) not in TYPICAL_IGNORED_MACROS]
\ No newline at end of file
+    return [c for c in n.child_view if c.macro not in TYPICAL_IGNORED_MACROS]
\ No newline at end of file
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""what the upwalker finds through the ScopeTables: shadowing, noscope, barriers, and edits."""
+
+import sys
+import unittest
+from io import StringIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.exceptions import MacroAssertFailed
+from core.macro_registry import MacroContext
+from core.macrocosm import Macrocosm, create_macrocosm
+from core.node import Node, Position, SaneIdentifier, tree_observers
+from pipeline.local_lookup import LastThenSearchStrategy, Upwalker, walk_upwards_for_local_definition
+from utils.logger import configure_logger_from_args
+
+configure_logger_from_args(None)
+
+
+def node(content: str, *children: Node) -> Node:
+    return Node(content, Position(0, 0), list(children))
+
+
+def context(compiler: Macrocosm, at: Node) -> MacroContext:
+    return MacroContext(statement_out=StringIO(), expression_out=StringIO(), node=at, compiler=compiler)
+
+
+def find(compiler: Macrocosm, at: Node, name: str) -> Node | None:
+    result = walk_upwards_for_local_definition(context(compiler, at), name)
+    return None if result is None else result.node
+
+
+def find_last_then(compiler: Macrocosm, at: Node) -> Node | None:
+    result = Upwalker(LastThenSearchStrategy()).find(context(compiler, at))
+    return None if result is None else result.node
+
+
+# every test makes its own Macrocosm (the scope tables live on it): ./test calls the test methods
+# on a bare instance, no setUp
+class LocalLookupTest(unittest.TestCase):
+    def test_shadowing(self):
+        compiler = create_macrocosm()
+        outer = node("local x")
+        first_inner, second_inner = node("local x"), node("local x")
+        in_first, in_second, after = node("use x"), node("use x"), node("use x")
+        before = node("use x")
+        node("67lang:solution",
+             before,
+             outer,
+             node("do", first_inner, in_first),
+             node("do", node("use x"), second_inner, in_second),
+             after)
+        self.assertIsNone(find(compiler, before, "x"))
+        self.assertIs(find(compiler, in_first, "x"), first_inner)
+        # the sibling block's local isn't in scope here, so it's the innermost one before it
+        self.assertIs(find(compiler, in_second, "x"), second_inner)
+        self.assertIs(find(compiler, after, "x"), outer)
+        self.assertIsNone(find(compiler, after, "y"))
+
+    def test_nearest_wins_but_first_in_a_noscope(self):
+        compiler = create_macrocosm()
+        outer = node("local y")
+        first, second = node("local y"), node("local y")
+        nearest = node("local z")
+        use = node("use y")
+        node("67lang:solution",
+             outer,
+             node("noscope", first, node("local z"), second),
+             nearest,
+             use)
+        self.assertIs(find(compiler, use, "y"), first)
+        self.assertIs(find(compiler, use, "z"), nearest)
+
+    def test_sane_names(self):
+        compiler = create_macrocosm()
+        local = node("local class")
+        in_noscope = node("local new")
+        use = node("use")
+        node("67lang:solution", local, node("noscope", in_noscope), node("do", use))
+        self.assertIsNone(find(compiler, use, "_class"))
+        self.assertIsNone(find(compiler, use, "_new"))
+        # looked up since, so the tables have to notice
+        compiler.set_metadata(local, SaneIdentifier, "_class")
+        compiler.set_metadata(in_noscope, SaneIdentifier, "_new")
+        self.assertIs(find(compiler, use, "_class"), local)
+        self.assertIs(find(compiler, use, "class"), local)
+        self.assertIs(find(compiler, use, "_new"), in_noscope)
+
+    def test_barrier(self):
+        compiler = create_macrocosm()
+        use, use_inside = node("use x"), node("use x")
+        node("67lang:solution",
+             node("local x"),
+             node("local a b"),
+             use,
+             node("noscope", node("local x"), node("local c d"), node("local y")),
+             node("do", use_inside))
+        # looking at a local that isn't `local name` is an error, and a lookup can't get past one
+        for at, name in ((use, "x"), (use_inside, "zzz")):
+            errors = len(compiler.compile_errors)
+            with self.assertRaises(MacroAssertFailed):
+                find(compiler, at, name)
+            self.assertEqual(len(compiler.compile_errors), errors + 1)
+        # inside the noscope, what comes before the barrier is fine
+        self.assertEqual(find(compiler, use_inside, "x").parent.macro, "noscope")
+        with self.assertRaises(MacroAssertFailed):
+            find(compiler, use_inside, "y")
+
+    def test_edits_after_lookups(self):
+        compiler = create_macrocosm()
+        outer = node("local x")
+        use = node("use x")
+        block = node("do", node("noop"), node("noop"), use)
+        root = node("67lang:solution", outer, block)
+        self.assertIs(find(compiler, use, "x"), outer)
+
+        tree_observers.append(compiler)
+        try:
+            # into the part of the table already built
+            inserted = node("local x")
+            block.replace_child(block.children[1], inserted)
+            self.assertIs(find(compiler, use, "x"), inserted)
+            block.replace_child(inserted, None)
+            self.assertIs(find(compiler, use, "x"), outer)
+
+            # a noscope that gains a definition after its parent's table went past it
+            noscope = node("noscope")
+            block.prepend_child(noscope)
+            self.assertIs(find(compiler, use, "x"), outer)
+            in_noscope = node("local x")
+            noscope.append_child(in_noscope)
+            self.assertIs(find(compiler, use, "x"), in_noscope)
+
+            # and moves
+            root.append_child(use)
+            self.assertIs(find(compiler, use, "x"), outer)
+        finally:
+            tree_observers.remove(compiler)
+
+    def test_last_then(self):
+        compiler = create_macrocosm()
+        then = node("local _result", node("67lang:last_then"))
+        use = node("use")
+        block = node("do", node("local _earlier", node("67lang:last_then")), then, node("local other"), use)
+        node("67lang:solution", block)
+        self.assertIs(find_last_then(compiler, use), then)
+
+        tree_observers.append(compiler)
+        try:
+            # a local becomes a pipeline result when it gets the marker as its first child
+            later = node("local _later")
+            block.replace_child(block.children[2], later)
+            self.assertIs(find_last_then(compiler, use), then)
+            later.append_child(node("67lang:last_then"))
+            self.assertIs(find_last_then(compiler, use), later)
+            # same for one in a noscope, which is in the table of the noscope's parent
+            in_noscope = node("local _in_noscope")
+            block.replace_child(later, node("noscope", in_noscope))
+            self.assertIs(find_last_then(compiler, use), then)
+            in_noscope.append_child(node("67lang:last_then"))
+            self.assertIs(find_last_then(compiler, use), in_noscope)
+        finally:
+            tree_observers.remove(compiler)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+"""
+on-disk cache helpers for derived compiler artifacts.
+everything stored here is regenerated on demand, so the cache directory can be nuked at any time.
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Iterable
+
+from utils.logger import default_logger
+
+CACHE_DIR = Path(__file__).parent.parent.parent / ".cache"
+
+
+def fingerprint(paths: Iterable[Path]) -> bytes:
+    """
+    sha256 over the paths, sizes and mtimes of the given files, in the given order.
+    same staleness rule python itself uses for .pyc files - hashing the actual contents
+    of the compiler sources would cost more than most of what the caches save.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        stat = path.stat()
+        digest.update(f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}\0".encode())
+    return digest.digest()
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    """write via a temp file + rename so concurrent compiler runs never observe a half written file"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def try_write_bytes(path: Path, data: bytes) -> bool:
+    """
+    atomic_write_bytes, except an unwritable cache (read-only checkout, full disk...) is only a
+    cache that doesn't get filled - logged, and False
+    """
+    try:
+        atomic_write_bytes(path, data)
+    except OSError as e:
+        default_logger.cache("can't write {}: {}", path, e)
+        return False
+    return True
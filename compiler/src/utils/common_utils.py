@@ -6,7 +6,6 @@ from dataclasses import replace
 from typing import List, Optional
 from utils.strutil import IndentedStringIO, cut
 from core.macro_registry import MacroContext
-from core.node import Args
 from utils.logger import default_logger
 
 def collect_child_expressions(ctx: MacroContext) -> List[str]:
@@ -22,19 +21,19 @@ def collect_child_expressions(ctx: MacroContext) -> List[str]:
     """
     expressions: List[Optional[str]] = []
     
-    default_logger.debug(f"collecting expressions from {len(ctx.node.children)} children")
+    default_logger.debug("collecting expressions from {} children", len(ctx.node.child_view))
     
-    for i, child in enumerate(ctx.node.children):
-        with default_logger.indent("debug", f"processing child {i}: {child.content}"):
+    for i, child in enumerate(ctx.node.child_view):
+        with default_logger.indent("debug", "processing child {}: {}", i, child.content):
             expression_out = IndentedStringIO()
             child_ctx = replace(ctx, node=child, expression_out=expression_out)
             ctx.current_step.process_node(child_ctx)
             expr_value = expression_out.getvalue()
             expressions.append(expr_value)
-            default_logger.debug(f"child {i} produced: '{expr_value}'")
+            default_logger.debug("child {} produced: '{}'", i, expr_value)
     
     result = [expr for expr in expressions if expr]
-    default_logger.debug(f"filtered {len(expressions)} -> {len(result)} non-empty expressions")
+    default_logger.debug("filtered {} -> {} non-empty expressions", len(expressions), len(result))
     return result
 
 def collect_child_types(ctx: MacroContext) -> List[str]:
@@ -54,17 +53,17 @@ def collect_child_types(ctx: MacroContext) -> List[str]:
         
     types: List[Optional[str]] = []
     
-    default_logger.typecheck(f"collecting types from {ctx.node.content}")
+    default_logger.typecheck("collecting types from {}", ctx.node.content)
     
-    for i, child in enumerate(ctx.node.children):
-        with default_logger.indent("typecheck", f"type checking child {i}: {child.content}"):
+    for i, child in enumerate(ctx.node.child_view):
+        with default_logger.indent("typecheck", "type checking child {}: {}", i, child.content):
             child_ctx = replace(ctx, node=child)
             child_type = ctx.current_step.process_node(child_ctx)
             types.append(child_type)
-            default_logger.typecheck(f"child {i} has type: '{child_type}'")
+            default_logger.typecheck("child {} has type: '{}'", i, child_type)
     
     result = [t for t in types if t]
-    default_logger.typecheck(f"filtered {len(types)} -> {len(result)} non-empty types")
+    default_logger.typecheck("filtered {} -> {} non-empty types", len(types), len(result))
     return result
 
 def process_children_with_context(ctx: MacroContext, step_processor) -> None:
@@ -76,10 +75,10 @@ def process_children_with_context(ctx: MacroContext, step_processor) -> None:
         ctx: the macro context  
         step_processor: the processing step to apply to each child
     """
-    default_logger.debug(f"processing children of {ctx.node.content} with {step_processor.__class__.__name__}")
+    default_logger.debug("processing children of {} with {}", ctx.node.content, step_processor.__class__.__name__)
     
-    for i, child in enumerate(ctx.node.children):
-        with default_logger.indent("debug", f"processing child {i}: {child.content}"):
+    for i, child in enumerate(ctx.node.child_view):
+        with default_logger.indent("debug", "processing child {}: {}", i, child.content):
             with ctx.compiler.safely:
                 child_ctx = replace(ctx, node=child)
                 step_processor.process_node(child_ctx)
@@ -95,8 +94,8 @@ def get_args_string(ctx: MacroContext) -> str:
     Returns:
         the arguments string
     """
-    args = ctx.compiler.get_metadata(ctx.node, Args)
-    default_logger.debug(f"extracted args: '{args}'")
+    args = ctx.node.args
+    default_logger.debug("extracted args: '{}'", args)
     return args
 
 def get_single_arg(ctx: MacroContext, error_msg: str = "must have a single argument") -> str:
@@ -114,7 +113,7 @@ def get_single_arg(ctx: MacroContext, error_msg: str = "must have a single argum
     args = get_args_string(ctx)
     first, extra = cut(args, " ")
     ctx.compiler.assert_(extra == "", ctx.node, error_msg)
-    default_logger.debug(f"validated single arg: '{first}'")
+    default_logger.debug("validated single arg: '{}'", first)
     return first
 
 def get_two_args(ctx: MacroContext, error_msg: str = "must have exactly two arguments") -> tuple[str, str]:
@@ -131,7 +130,7 @@ def get_two_args(ctx: MacroContext, error_msg: str = "must have exactly two argu
     args = get_args_string(ctx)
     args_list = args.split(" ")
     ctx.compiler.assert_(len(args_list) == 2, ctx.node, error_msg)
-    default_logger.debug(f"validated two args: '{args_list[0]}', '{args_list[1]}'")
+    default_logger.debug("validated two args: '{}', '{}'", args_list[0], args_list[1])
     return args_list[0], args_list[1]
 
 
@@ -4,10 +4,12 @@ supports tag-based filtering and automatic indentation based on call stack depth
 """
 
 import sys
-from typing import Set, Optional, TextIO, List
-from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Callable, Dict, Set, Optional, TextIO, List, Union
 import threading
 
+if TYPE_CHECKING:
+    from utils.tracer import Tracer
+
 class SmartIndentContext:
     """Tracks whether any output was produced in an indented context"""
     def __init__(self, tag: str, message: str, indent_level: int):
@@ -16,7 +18,99 @@ class SmartIndentContext:
         self.indent_level = indent_level
         self.had_output = False
         self.header_printed = False
-        
+
+
+def _render(message: Union[str, Callable[..., str]], args: tuple) -> str:
+    if callable(message):
+        return message(*args)
+    return message.format(*args) if args else message
+
+
+class _NoIndent:
+    """what indent hands out for a disabled tag. no state, so it's the one instance"""
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+_NO_INDENT = _NoIndent()
+
+
+class _Indent:
+    def __init__(self, logger: "Logger", tag: str, message: str, log: bool, node: Any = None):
+        self.logger = logger
+        self.tag = tag
+        self.message = message
+        # False for a disabled tag that's only here for the tracer
+        self.log = log
+        self.node = node
+        self.context: Optional[SmartIndentContext] = None
+
+    def __enter__(self) -> None:
+        logger = self.logger
+        if self.log:
+            with logger._lock:
+                # Create a new context but don't print header yet
+                self.context = SmartIndentContext(self.tag, self.message, logger._indent_level)
+                logger._context_stack.append(self.context)
+                logger._indent_level += 1
+        self.tracer = logger.tracer
+        if self.tracer is not None:
+            self.start = self.tracer.now()
+
+    def __exit__(self, *exc) -> None:
+        if self.tracer is not None:
+            self.tracer.complete(self.message, self.tag, self.start, self.tracer.now(), self.node)
+        logger = self.logger
+        context = self.context
+        if context is None:
+            return
+        with logger._lock:
+            if context in logger._context_stack:
+                logger._context_stack.remove(context)
+                logger._indent_level -= 1
+
+                # Only print footer if we had output and header was printed
+                if context.had_output and context.header_printed:
+                    indent = "  " * logger._indent_level
+                    logger.output.write(f"{indent}[{self.tag}] done: {self.message}\n")
+                    logger.output.flush()
+
+
+class LogTag:
+    """
+    one logging tag, callable to log under it. `enabled` is kept current by the Logger, so a
+    disabled tag costs a call and that one check - as long as the message isn't built up front.
+    hence the format args (str.format style) or a callable taking them, both only used when enabled:
+
+        default_logger.typecheck("child {} has type: '{}'", i, child_type)
+        default_logger.registry(lambda: ", ".join(registry.all()))
+    """
+    __slots__ = ("name", "enabled", "_logger")
+
+    def __init__(self, logger: "Logger", name: str):
+        self._logger = logger
+        self.name = name
+        self.enabled = logger.is_tag_enabled(name)
+
+    def __call__(self, message: Union[str, Callable[..., str]], *args: Any) -> None:
+        if self.enabled:
+            self._logger._write(self.name, _render(message, args))
+
+    def indent(self, message: Union[str, Callable[..., str]], *args: Any, node: Any = None) -> "_Indent | _NoIndent":
+        """
+        context manager that logs entry/exit with indentation.
+        useful for tracking entering/exiting functions or processing steps.
+        only prints header/footer if something was logged inside.
+        with a tracer on the logger it's also a span, enabled or not (`node` goes into its args),
+        see utils/tracer.py
+        """
+        if not self.enabled and self._logger.tracer is None:
+            return _NO_INDENT
+        return _Indent(self._logger, self.name, _render(message, args), self.enabled, node)
+
+
 class Logger:
     """
     a logger that supports tag filtering and automatic indentation.
@@ -30,14 +124,42 @@ class Logger:
         self._indent_level = 0
         self._lock = threading.Lock()  # thread safety for indent level
         self._context_stack: List[SmartIndentContext] = []  # track indented contexts
+        self._tags: Dict[str, LogTag] = {}
+        # turns every indent into a trace span when set
+        self.tracer: Optional["Tracer"] = None
+
+        # the tags with a shorthand, `default_logger.typecheck(...)`
+        self.debug = self.tag("debug")
+        self.typecheck = self.tag("typecheck")
+        self.macro = self.tag("macro")
+        self.compile = self.tag("compile")
+        self.codegen = self.tag("codegen")
+        self.parse = self.tag("parse")
+        self.registry = self.tag("registry")
+        self.metadata = self.tag("metadata")
+        self.metadata_debug = self.tag("metadata_debug")
+        self.cache = self.tag("cache")
+
+    def tag(self, name: str) -> LogTag:
+        """the LogTag for `name`, made on first use"""
+        tag = self._tags.get(name)
+        if tag is None:
+            tag = self._tags[name] = LogTag(self, name)
+        return tag
         
     def enable_tags(self, tags: Set[str]):
         """enable only the specified tags. if empty set, disable all logging."""
         self.enabled_tags = tags
+        self._refresh_tags()
         
     def enable_all_tags(self):
         """enable all tags (default behavior)."""
         self.enabled_tags = None
+        self._refresh_tags()
+
+    def _refresh_tags(self):
+        for tag in self._tags.values():
+            tag.enabled = self.is_tag_enabled(tag.name)
         
     def is_tag_enabled(self, tag: str) -> bool:
         """check if a tag should be logged."""
@@ -45,11 +167,15 @@ class Logger:
             return True
         return tag in self.enabled_tags
         
-    def log(self, tag: str, message: str):
-        """log a message with the given tag if enabled."""
-        if not self.is_tag_enabled(tag):
-            return
-            
+    def log(self, tag: str, message: Union[str, Callable[..., str]], *args: Any):
+        """log a message with the given tag if enabled. see LogTag for the args"""
+        self.tag(tag)(message, *args)
+
+    def indent(self, tag: str, message: Union[str, Callable[..., str]], *args: Any, node: Any = None) -> "_Indent | _NoIndent":
+        """see LogTag.indent"""
+        return self.tag(tag).indent(message, *args, node=node)
+
+    def _write(self, tag: str, message: str):
         with self._lock:
             # Print any pending headers first
             self._ensure_headers_printed()
@@ -70,71 +196,6 @@ class Logger:
                 self.output.write(f"{indent}[{context.tag}] begin: {context.message}\n")
                 self.output.flush()
                 context.header_printed = True
-    
-    @contextmanager
-    def indent(self, tag: str, message: str):
-        """
-        context manager that logs entry/exit with indentation.
-        useful for tracking entering/exiting functions or processing steps.
-        only prints header/footer if something was logged inside.
-        """
-        if not self.is_tag_enabled(tag):
-            yield
-            return
-        
-        context = None
-        try:
-            with self._lock:
-                # Create a new context but don't print header yet
-                context = SmartIndentContext(tag, message, self._indent_level)
-                self._context_stack.append(context)
-                self._indent_level += 1
-            
-            yield
-            
-        finally:
-            with self._lock:
-                if context and context in self._context_stack:
-                    self._context_stack.remove(context)
-                    self._indent_level -= 1
-                    
-                    # Only print footer if we had output and header was printed
-                    if context.had_output and context.header_printed:
-                        indent = "  " * self._indent_level
-                        self.output.write(f"{indent}[{tag}] done: {message}\n")
-                        self.output.flush()
-    
-    def debug(self, message: str):
-        """convenience method for debug messages."""
-        self.log("debug", message)
-        
-    def typecheck(self, message: str):
-        """convenience method for typecheck messages."""
-        self.log("typecheck", message)
-        
-    def macro(self, message: str):
-        """convenience method for macro processing messages."""
-        self.log("macro", message)
-        
-    def compile(self, message: str):
-        """convenience method for general compilation messages."""
-        self.log("compile", message)
-        
-    def codegen(self, message: str):
-        """convenience method for code generation messages."""
-        self.log("codegen", message)
-        
-    def parse(self, message: str):
-        """convenience method for parsing messages."""
-        self.log("parse", message)
-        
-    def registry(self, message: str):
-        """convenience method for macro registry messages."""
-        self.log("registry", message)
-        
-    def metadata_debug(self, message: str):
-        """convenience method for metadata messages."""
-        self.log("metadata_debug", message)
 
 # global logger instance that can be configured
 default_logger = Logger()
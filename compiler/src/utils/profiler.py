@@ -0,0 +1,190 @@
+"""
+where compile time goes, for `main.py --profile out.json`.
+
+a CompileProfiler collects wall and cpu time per stage (parsing, macrocosm setup, each pipeline
+step), call counts and time per macro handler (MacroRegistry.wrapped wraps the handlers), the
+nodes whose handlers took longest, and peak memory. one profiler can sit through any number of
+compilations (a --batch run), stages and handlers just add up.
+
+the report is meant to be diffed over time, so its shape only changes along with REPORT_VERSION:
+
+    {
+      "format": "67lang-compile-profile", "version": 1,
+      "compilations": 1,
+      "wall_ms": ..., "cpu_ms": ...,               # sum of the top level stages
+      "peak_rss_kib": ...,                         # of the whole process, so far
+      "stages": [{"name", "parent", "calls", "wall_ms", "cpu_ms"}],  # first seen first
+      "macros": [{"step", "macro", "calls", "total_ms", "self_ms"}],  # most total_ms first
+      "slowest_nodes": [{"step", "macro", "file", "line", "content", "total_ms", "self_ms"}]
+    }
+
+times are rounded to microseconds. a handler's total includes the handlers it called into
+(providers mostly recurse through process_node), its self time doesn't, and that's what the
+slowest nodes are ranked by.
+"""
+
+import heapq
+import resource
+import time
+from contextlib import nullcontext
+from itertools import count
+from typing import Any, Callable, ContextManager
+
+from core.node import Node
+
+REPORT_FORMAT = "67lang-compile-profile"
+REPORT_VERSION = 1
+
+# how much of a node's content goes into the report
+CONTENT_PREVIEW = 80
+
+
+class _Stage:
+    def __init__(self, profiler: "CompileProfiler", name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self) -> None:
+        profiler = self.profiler
+        self.totals = profiler._stages.get(self.name)
+        if self.totals is None:
+            parent = profiler._open_stages[-1] if profiler._open_stages else None
+            self.totals = profiler._stages[self.name] = {"parent": parent, "calls": 0, "wall": 0.0, "cpu": 0.0}
+        profiler._open_stages.append(self.name)
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+
+    def __exit__(self, *exc) -> None:
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        self.profiler._open_stages.pop()
+        totals = self.totals
+        totals["calls"] += 1
+        totals["wall"] += wall
+        totals["cpu"] += cpu
+
+
+class CompileProfiler:
+    def __init__(self, slowest: int = 20):
+        self.slowest = slowest
+        self.compilations = 0
+        # stage name -> parent, calls, wall, cpu. dicts keep insertion order, so first seen first
+        self._stages: dict[str, dict[str, Any]] = {}
+        self._open_stages: list[str] = []
+        # (step, macro) -> [calls, total seconds, self seconds]
+        self._macros: dict[tuple[str, str], list] = {}
+        # min-heap of (self seconds, tiebreak, entry), the `slowest` biggest
+        self._nodes: list[tuple[float, int, dict[str, Any]]] = []
+        self._tiebreak = count()
+        # time spent in handlers called from the currently running one, per level
+        self._child_time: list[float] = []
+        # every parsed node -> its file, taken before preprocessing moves nodes between files
+        self._files: dict[Node, str] = {}
+
+    def begin_compilation(self) -> None:
+        self.compilations += 1
+        # the last compilation's trees can go
+        self._files.clear()
+
+    def stage(self, name: str) -> ContextManager[None]:
+        """times a `with` block as `name`, nested under whatever stage is already open"""
+        return _Stage(self, name)
+
+    def add_file(self, name: str, root: Node) -> None:
+        """remembers which file every node of a freshly parsed tree came from"""
+        files = self._files
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            files[node] = name
+            stack.extend(node.child_view)
+
+    def wrap(self, step: str, macro: str, handler: Callable) -> Callable:
+        """`handler`, timed into this profiler. see MacroRegistry.wrapped"""
+        stats = self._macros.get((step, macro))
+        if stats is None:
+            stats = self._macros[(step, macro)] = [0, 0.0, 0.0]
+        child_time = self._child_time
+
+        def timed(ctx):
+            child_time.append(0.0)
+            start = time.perf_counter()
+            try:
+                return handler(ctx)
+            finally:
+                total = time.perf_counter() - start
+                own = total - child_time.pop()
+                if child_time:
+                    child_time[-1] += total
+                stats[0] += 1
+                stats[1] += total
+                stats[2] += own
+                self._record_node(step, macro, ctx.node, total, own)
+
+        return timed
+
+    def _record_node(self, step: str, macro: str, node: Node, total: float, own: float) -> None:
+        if len(self._nodes) >= self.slowest and own <= self._nodes[0][0]:
+            return
+        pos = node.pos
+        entry = {
+            "step": step,
+            "macro": macro,
+            "file": self._file_of(node),
+            "line": pos.line if pos is not None else None,
+            "content": node.content[:CONTENT_PREVIEW],
+            "total_ms": _ms(total),
+            "self_ms": _ms(own),
+        }
+        item = (own, next(self._tiebreak), entry)
+        if len(self._nodes) < self.slowest:
+            heapq.heappush(self._nodes, item)
+        else:
+            heapq.heapreplace(self._nodes, item)
+
+    def _file_of(self, node: Node) -> str | None:
+        # nodes made during compilation aren't in _files, but they sit under one that is
+        while node is not None:
+            name = self._files.get(node)
+            if name is not None:
+                return name
+            node = node.parent
+        return None
+
+    def report(self) -> dict[str, Any]:
+        top_level = [totals for totals in self._stages.values() if totals["parent"] is None]
+        macros = sorted(self._macros.items(), key=lambda item: (-item[1][1], item[0]))
+        return {
+            "format": REPORT_FORMAT,
+            "version": REPORT_VERSION,
+            "compilations": self.compilations,
+            "wall_ms": _ms(sum(totals["wall"] for totals in top_level)),
+            "cpu_ms": _ms(sum(totals["cpu"] for totals in top_level)),
+            # ru_maxrss is KiB on linux
+            "peak_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            "stages": [
+                {
+                    "name": name,
+                    "parent": totals["parent"],
+                    "calls": totals["calls"],
+                    "wall_ms": _ms(totals["wall"]),
+                    "cpu_ms": _ms(totals["cpu"]),
+                }
+                for name, totals in self._stages.items()
+            ],
+            "macros": [
+                {"step": step, "macro": macro, "calls": calls, "total_ms": _ms(total), "self_ms": _ms(own)}
+                for (step, macro), (calls, total, own) in macros
+                if calls
+            ],
+            "slowest_nodes": [entry for _, _, entry in sorted(self._nodes, reverse=True)],
+        }
+
+
+def stage(profiler: CompileProfiler | None, name: str) -> ContextManager[None]:
+    """profiler.stage(name), or nothing at all without a profiler"""
+    return nullcontext() if profiler is None else profiler.stage(name)
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
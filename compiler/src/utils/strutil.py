@@ -4,13 +4,6 @@ def cut(line:str, sep:str) -> tuple[str, str]:
         return line, ""
     return line[:index], line[index+len(sep):]
     
-def extract_indent(line: str, max: int = None) -> tuple[str, int]:
-    indent = 0
-    while line.startswith('\t') and (max is None or indent < max):
-        indent += 1
-        line = line[1:]
-    return line, indent
-
 from io import StringIO
 from typing import Any, Union, List
 
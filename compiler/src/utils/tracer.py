@@ -0,0 +1,81 @@
+"""
+chrome trace event export of a compilation, for `main.py --trace trace.json`. load the file in
+perfetto (ui.perfetto.dev) or chrome://tracing.
+
+the spans are the logger's: with a Tracer on `default_logger.tracer`, every `default_logger.indent`
+becomes a span whether its tag is enabled or not, so the trace nests the way the log indents do -
+the parse of each file, each pipeline step, the nodes the steps walk through. on top of that, with
+`handler_threshold_ms` set, every macro handler call that takes at least that long gets a span too
+(handlers get wrapped like for the profiler, see Macrocosm).
+
+spans are complete ("X") events, written when they end, so the ones under the threshold simply
+never show up and nothing has to be patched up after. spans that know their node carry its
+content and position in args.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Callable
+
+from core.node import Node
+
+# how much of a node's content goes into a span
+CONTENT_PREVIEW = 80
+
+
+class Tracer:
+    def __init__(self, handler_threshold_ms: float | None = None):
+        # None leaves handlers alone, only the logger's spans get recorded
+        self.handler_threshold = None if handler_threshold_ms is None else handler_threshold_ms / 1000
+        self.events: list[dict[str, Any]] = []
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+
+    def now(self) -> float:
+        return time.perf_counter()
+
+    def complete(self, name: str, category: str, start: float, end: float, node: Node | None = None) -> None:
+        """records a span that ran from `start` to `end` (both from `now`)"""
+        event: dict[str, Any] = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": round((start - self._origin) * 1e6, 3),
+            "dur": round((end - start) * 1e6, 3),
+            "pid": self._pid,
+            "tid": threading.get_ident(),
+        }
+        if node is not None:
+            pos = node.pos
+            event["args"] = {
+                "content": node.content[:CONTENT_PREVIEW],
+                "line": pos.line if pos is not None else None,
+                "char": pos.char if pos is not None else None,
+            }
+        self.events.append(event)
+
+    def wrap(self, step: str, macro: str, handler: Callable) -> Callable:
+        """`handler`, with a span for every call over the threshold. see MacroRegistry.wrapped"""
+        if self.handler_threshold is None:
+            return handler
+        threshold = self.handler_threshold
+        name = f"{step}: {macro}"
+
+        def traced(ctx):
+            start = time.perf_counter()
+            try:
+                return handler(ctx)
+            finally:
+                end = time.perf_counter()
+                if end - start >= threshold:
+                    self.complete(name, "handler", start, end, ctx.node)
+
+        return traced
+
+    def write(self, path: str) -> None:
+        metadata = {"name": "process_name", "ph": "M", "pid": self._pid, "args": {"name": "67lang compiler"}}
+        with open(path, "w") as f:
+            json.dump({"traceEvents": [metadata] + self.events, "displayTimeUnit": "ms"}, f)
+            f.write("\n")